@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of class composition modes
+
+Compares cost of class regeneration after each new extension is
+registered, for flat (default) and incremental composition modes.
+
+Run it as::
+
+    python benchmarks/bench_composition.py [max-extensions [step]]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+import six
+
+# Allow to run benchmark from source checkout, without installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extend_me import ExtensibleType  # noqa: E402
+
+
+def run(count, step, incremental):
+    """ Registers *count* extensions one by one, regenerating class
+        after each registration.
+
+        :return: list of (number of extensions, seconds) pairs,
+                 with time spent to regenerate class after
+                 registration of each *step*-th extension
+    """
+    mc = ExtensibleType._("BenchObject", incremental=incremental)
+
+    @six.add_metaclass(mc)
+    class BenchObject(object):
+        pass
+
+    mc.get_class()
+
+    results = []
+    for i in range(1, count + 1):
+        type(BenchObject)('BenchExt%d' % i, (BenchObject,), {
+            'method_%d' % i: lambda self, i=i: i,
+        })
+        start = timeit.default_timer()
+        mc.get_class()
+        elapsed = timeit.default_timer() - start
+        if i % step == 0:
+            results.append((i, elapsed))
+    return results
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 500
+    step = int(argv[1]) if len(argv) > 1 else max(count // 10, 1)
+
+    flat = run(count, step, incremental=False)
+    incremental = run(count, step, incremental=True)
+
+    print("%12s %16s %16s" % ("extensions", "flat, us", "incremental, us"))
+    for (n, t_flat), (_, t_inc) in zip(flat, incremental):
+        print("%12d %16.1f %16.1f" % (n, t_flat * 1e6, t_inc * 1e6))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
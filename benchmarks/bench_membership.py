@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of membership checks
+
+Compares ``mc.is_instance`` with builtin *isinstance* for extension tree
+created with *ABCMeta* (50 extensions), as number of generated classes
+(built for different profiles) grows:
+
+- positive check (object of generated class)
+- negative check (object of unrelated class)
+- negative check right after registration of new virtual subclass
+  of root class (so all ABC caches are invalidated)
+
+Run it as::
+
+    python benchmarks/bench_membership.py [max-generated [calls]]
+"""
+from __future__ import print_function
+
+import abc
+import os
+import random
+import sys
+import timeit
+
+import six
+
+# Allow to run benchmark from source checkout, without installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extend_me import ExtensibleType  # noqa: E402
+
+# Number of extensions in tree
+EXTENSIONS = 50
+
+# Number of checks after registration of virtual subclass
+REGISTER_CALLS = 50
+
+
+def make_tree():
+    mc = ExtensibleType._("BenchCheck", with_meta=abc.ABCMeta,
+                          cache_size=None)
+
+    @six.add_metaclass(mc)
+    class BenchCheck(object):
+        pass
+
+    extensions = [mc('BenchCheckExt%d' % i, (BenchCheck,), {})
+                  for i in range(EXTENSIONS)]
+    return mc, BenchCheck, extensions
+
+
+def generate_classes(mc, extensions, count, rnd, classes):
+    """ Generates classes (for random profiles) until there are
+        *count* of them in *classes*
+    """
+    seen = set(frozenset(c.__bases__) for c in classes)
+    while len(classes) < count:
+        profile = frozenset(rnd.sample(extensions, 3))
+        with mc.activate(profile):
+            cls = mc.get_class()
+        if frozenset(cls.__bases__) not in seen:
+            seen.add(frozenset(cls.__bases__))
+            classes.append(cls)
+
+
+def measure(func, calls):
+    return min(timeit.repeat(func, number=calls, repeat=3))
+
+
+def measure_after_register(root, check):
+    """ Measures time of checks, each done right after registration
+        of new virtual subclass (time of registration is not counted)
+    """
+    total = 0.0
+    for _ in range(REGISTER_CALLS):
+        root.register(type('Virtual', (object,), {}))
+        total += timeit.timeit(check, number=1)
+    return total
+
+
+def main(argv):
+    max_generated = int(argv[0]) if argv else 3000
+    calls = int(argv[1]) if len(argv) > 1 else 200000
+
+    rnd = random.Random(42)
+    mc, root, extensions = make_tree()
+    obj = mc.get_object()
+    other = object()
+    classes = [type(obj)]
+
+    print("%10s %-22s %-22s %-22s" % (
+        "generated", "positive, s", "negative, s",
+        "after register, s"))
+    print("%10s %-22s %-22s %-22s" % (
+        "", "isinstance/is_inst.", "isinstance/is_inst.",
+        "isinstance/is_inst."))
+    count = 10
+    while True:
+        count = min(count, max_generated)
+        generate_classes(mc, extensions, count, rnd, classes)
+        results = (
+            measure(lambda: isinstance(obj, root), calls),
+            measure(lambda: mc.is_instance(obj), calls),
+            measure(lambda: isinstance(other, root), calls),
+            measure(lambda: mc.is_instance(other), calls),
+            measure_after_register(root, lambda: isinstance(other, root)),
+            measure_after_register(root, lambda: mc.is_instance(other)),
+        )
+        print("%10d %9.3f / %-10.3f %9.3f / %-10.3f %9.3f / %-10.3f" % (
+            (len(classes),) + results))
+        if count >= max_generated:
+            break
+        count *= 10
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
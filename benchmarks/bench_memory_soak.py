@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+""" Memory soak benchmark of long-running registries
+
+Repeatedly creates dynamic extensions (in temporary extension trees,
+in temporary child trees of long-living tree, and in long-living trees
+inside snapshots, that are restored after each round), requests
+classes for random keys (with and without ``default=True``) and creates
+objects via *Extensible*. Part of requests is done to long-living trees
+outside of snapshots, so state that is not restored by snapshots
+is checked too.
+
+Memory usage (RSS), number of objects tracked by GC, number of live
+generated classes and size of registry of long-living tree (keys,
+generated classes and child trees) are recorded after each *interval*
+rounds. Benchmark fails (exit code 1) if average of any of them over
+last half of samples is more than *max-growth* percent above average
+over first half of samples (taken after warm up). Averages are used,
+as sizes of bounded caches fluctuate from round to round.
+
+Run it as::
+
+    python benchmarks/bench_memory_soak.py [rounds [interval [max-growth]]]
+"""
+from __future__ import print_function
+
+import gc
+import os
+import random
+import sys
+
+import six
+
+# Allow to run benchmark from source checkout, without installation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extend_me  # noqa: E402
+from extend_me import Extensible, ExtensibleByHashType  # noqa: E402
+
+# Number of keys used by long-living tree
+KEYS = 20
+
+# Number of dynamic extensions created by each round
+EXTENSIONS = 10
+
+# Number of rounds before first sample, enough to fill bounded caches
+# (like caches of recently generated classes)
+WARMUP = 500
+
+
+def get_rss():
+    """ Returns resident set size of current process in KiB
+        (peak size if current one is not available)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (IOError, OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def count_generated_classes():
+    """ Returns number of live classes generated by extension trees
+    """
+    return sum(1 for o in gc.get_objects()
+               if isinstance(o, type) and o.__dict__.get('_generated'))
+
+
+def get_registry_size(mcs):
+    """ Returns number of entries in registry of extension tree *mcs*,
+        that have to stay bounded: registered keys, classes generated
+        for keys and child trees
+    """
+    return (len(mcs._base_classes_hash) + len(mcs._generated_class) +
+            len(mcs._children))
+
+
+def make_tree(name):
+    """ Creates hash based extension tree with extension for each key
+    """
+    mc = ExtensibleByHashType._(name, hashattr='name')
+
+    @six.add_metaclass(mc)
+    class SoakBase(object):
+        def __init__(self, value=None):
+            self.value = value
+
+    for i in range(KEYS):
+        mc('SoakKey%d' % i, (SoakBase,), {
+            'Meta': type('Meta', (object,), {'name': 'key-%d' % i}),
+        })
+    return mc, SoakBase
+
+
+def run_round(rnd, mc, base, ext_base):
+    # Temporary tree, that have to be collected when not used anymore
+    tmp_mc, tmp_base = make_tree('SoakTmp')
+    for i in range(EXTENSIONS):
+        tmp_mc('SoakTmpExt%d' % i, (tmp_base,), {})
+    tmp_mc.get_class('key-%d' % rnd.randrange(KEYS))()
+
+    # Temporary child tree of long-living tree with its own extensions
+    child_mc = mc.child()
+    for i in range(EXTENSIONS):
+        key = 'key-%d' % rnd.randrange(KEYS)
+        child_mc('SoakChildExt%d' % i, (base,), {
+            'Meta': type('Meta', (object,), {'name': key}),
+        })
+    for _ in range(EXTENSIONS):
+        child_mc.get_class('key-%d' % rnd.randrange(KEYS))(1)
+        child_mc.get_class('unknown-%d' % rnd.randrange(10 ** 6),
+                           default=True)()
+
+    # Requests to long-living trees outside of snapshot
+    for _ in range(EXTENSIONS):
+        mc.get_class('key-%d' % rnd.randrange(KEYS))(1)
+        mc.get_class('unknown-%d' % rnd.randrange(10 ** 6),
+                     default=True)()
+        ext_base()
+
+    # Dynamic extensions of long-living trees, removed by restore
+    with extend_me.snapshot():
+        for i in range(EXTENSIONS):
+            key = 'key-%d' % rnd.randrange(KEYS)
+            mc('SoakExt%d' % i, (base,), {
+                'Meta': type('Meta', (object,), {'name': key}),
+            })
+            type(ext_base)('SoakExtensibleExt%d' % i, (ext_base,), {})
+        for _ in range(EXTENSIONS):
+            mc.get_class('key-%d' % rnd.randrange(KEYS))(1)
+            mc.get_class('unknown-%d' % rnd.randrange(10 ** 6),
+                         default=True)()
+            ext_base()
+
+    # Requests of classes for state restored from snapshot
+    for _ in range(EXTENSIONS):
+        mc.get_class('key-%d' % rnd.randrange(KEYS))(1)
+        try:
+            mc.get_class('unknown-%d' % rnd.randrange(10 ** 6))
+        except ValueError:
+            pass
+
+    # Temporary trees contain reference cycles (classes refer to their
+    # metaclass, that caches them), so they are collected only by GC.
+    # Collect them each round, so peak memory does not depend on when
+    # GC decides to do full collection
+    gc.collect()
+
+
+def main(argv):
+    rounds = int(argv[0]) if argv else 2000
+    interval = int(argv[1]) if len(argv) > 1 else max(rounds // 10, 1)
+    max_growth = float(argv[2]) if len(argv) > 2 else 10.0
+
+    rnd = random.Random(42)
+    mc, base = make_tree('Soak')
+
+    class SoakExtensible(Extensible):
+        pass
+
+    # Warm up: fill caches that are expected to be bounded
+    for _ in range(WARMUP):
+        run_round(rnd, mc, base, SoakExtensible)
+
+    print("%8s %12s %12s %12s %10s %8s" % (
+        "round", "RSS, KiB", "objects", "generated", "registry", "trees"))
+    samples = []
+    for i in range(rounds + 1):
+        if i % interval == 0:
+            gc.collect()
+            sample = (get_rss(), len(gc.get_objects()),
+                      count_generated_classes(), get_registry_size(mc))
+            samples.append(sample)
+            print("%8d %12d %12d %12d %10d %8d" % (
+                (i,) + sample + (len(extend_me._trees),)))
+        if i < rounds:
+            run_round(rnd, mc, base, SoakExtensible)
+
+    half = max(len(samples) // 2, 1)
+    failed = False
+    for name, values in zip(("RSS", "objects", "generated classes",
+                             "registry size"), zip(*samples)):
+        first = sum(values[:half]) / float(half)
+        last = sum(values[-half:]) / float(half)
+        growth = (last - first) * 100.0 / max(first, 1)
+        if growth > max_growth:
+            print("FAIL: %s grew by %.1f%% (%.0f -> %.0f), max %.1f%%" % (
+                name, growth, first, last, max_growth))
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: growth is below %.1f%%" % max_growth)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -241,14 +241,392 @@ that provided by extensions::
     >>> my_cool_obj.my_method2('World')
     Good by, World
 
+
+Inspecting extension trees
+--------------------------
+
+To see what extension trees are created by set of plugins,
+how many extensions and keys they have, and how much time takes
+import of each module that defines extensions, run::
+
+    python -m extend_me inspect <module-or-entry-point-group> [...]
+
+Each argument is name of module to import or, if there is no such
+module, name of entry point group, all entry points of which
+will be loaded.
+
 """
 __author__ = "Dmytro Katyukha <dmytro.katyukha@gmail.com>"
 __version__ = "1.1.5"
 
+import abc
+import bisect
 import collections
+import functools
+import hashlib
+import importlib
+import inspect
+import itertools
+import re
+import sys
+import threading
+import time
+import timeit
+import weakref
 import six
 
-__all__ = ('ExtensibleType', 'Extensible', 'ExtensibleByHashType', )
+try:
+    import contextvars
+except ImportError:  # Python < 3.7
+    contextvars = None
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+__all__ = (
+    'ExtensibleType', 'Extensible', 'ExtensibleByHashType',
+    'ExtensionProfiler', 'class_cached', 'is_stale', 'upgrade',
+    'snapshot', 'restore',
+)
+
+# Default number of recently generated classes kept by each extension tree
+_CLASS_CACHE_SIZE = 128
+
+# Policies of regeneration of classes after extension tree changed
+_REGENERATE_POLICIES = ('lazy', 'sync', 'background')
+
+# Default max number of objects kept by instance cache
+# (see ExtensibleByHashType.get_cached_object)
+_INSTANCE_CACHE_SIZE = 128
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# Version constraint used in range keys of ExtensibleByHashType ('>=12')
+_VERSION_CONSTRAINT_RE = re.compile(r'^\s*(>=|<=|==|>|<)\s*(\S+)\s*$')
+
+# All extension trees (metaclasses) created by this module
+_trees = weakref.WeakSet()
+
+# Hashes of source code of extensions: {class: hex digest}
+_source_hashes = weakref.WeakKeyDictionary()
+
+# Number of classes created by extension trees (extensions and generated
+# classes). Used to find out if graphs of subclasses used by ABC checks
+# are outdated
+_classes_created = 0
+
+
+class _LocalVar(object):
+    """ Thread local replacement of *contextvars.ContextVar*
+        for Python versions where *contextvars* is not available
+    """
+    def __init__(self, name, default=None):
+        self.name = name
+        self._default = default
+        self._local = threading.local()
+
+    def get(self):
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):
+        self._local.value = token
+
+
+def _abc_cache_token():
+    """ Returns token that is changed on each registration
+        of virtual subclass of any ABC
+    """
+    return abc.ABCMeta._abc_invalidation_counter  # Python < 3.4
+
+
+if hasattr(abc, 'get_cache_token'):
+    _abc_cache_token = abc.get_cache_token  # noqa: F811
+
+# Returns internal state of ABC (C implementation of ABC only)
+_abc_get_dump = getattr(abc, '_get_dump', None)
+
+
+def _abc_registry(cls):
+    """ Returns list of classes registered as virtual subclasses
+        of ABC *cls* (by *cls.register*), or None if registry
+        of this ABC implementation is not known
+    """
+    registry = cls.__dict__.get('_abc_registry', None)  # Python < 3.7
+    if registry is not None:
+        return list(registry)
+    if _abc_get_dump is not None:  # C implementation of ABC
+        refs = _abc_get_dump(cls)[0]
+        if not refs:
+            return []
+        return [c for c in (r() for r in refs) if c is not None]
+    return None
+
+
+def _check_abc_subclass(klass, cls, results, graph=None):
+    """ Same as *ABCMeta.__subclasscheck__*: checks if *klass* is
+        subclass of ABC *cls*, taking into account *__subclasshook__*,
+        registered virtual subclasses and subclasses of *cls*.
+
+        Unlike *ABCMeta*, that runs full check for each subclass with
+        its own caches (so after registration of any virtual subclass
+        classes reachable by several paths are checked again and again),
+        each subclass is checked once, and results are saved to
+        *results* dict {cls: result}. If *graph* of subclasses is given
+        (see :meth:`ExtensibleType._get_abc_graph`), only subclasses
+        from it are checked.
+
+        :return: True or False, or None if registry of some ABC
+                 is not known (see :func:`_abc_registry`)
+    """
+    result = results.get(cls, None)
+    if result is not None:
+        return result
+    results[cls] = False  # Guard against cycles of registrations
+
+    ok = cls.__subclasshook__(klass)
+    if ok is not NotImplemented:
+        result = bool(ok)
+    elif cls in getattr(klass, '__mro__', ()):
+        result = True
+    else:
+        registry = _abc_registry(cls)
+        if registry is not None:
+            result = any(issubclass(klass, rcls) for rcls in registry)
+        subclasses = graph.get(cls, None) if graph is not None else None
+        if subclasses is None:
+            subclasses = cls.__subclasses__()
+        for scls in ([] if result is not False else subclasses):
+            result = _check_abc_subclass(klass, scls, results, graph)
+            if result is not False:
+                break
+    if result is None:
+        del results[cls]
+    else:
+        results[cls] = result
+    return result
+
+
+def _drop_key(mapping, key, ref=None):
+    """ Removes *key* from *mapping*. Used as weakref callback
+    """
+    mapping.pop(key, None)
+
+
+def _qualname(cls):
+    return getattr(cls, '__qualname__', cls.__name__)
+
+
+def _source_hash(cls):
+    """ Returns hash of source code of class *cls*
+        (empty string if source is not available)
+    """
+    digest = _source_hashes.get(cls, None)
+    if digest is None:
+        try:
+            source = inspect.getsource(cls)
+        except (IOError, TypeError):  # No source (built in REPL, etc)
+            digest = ''
+        else:
+            digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        _source_hashes[cls] = digest
+    return digest
+
+
+def _context_var(name):
+    if contextvars is None:
+        return _LocalVar(name, default=None)
+    return contextvars.ContextVar(name, default=None)
+
+
+def _parse_version(value):
+    """ Returns version *value* (int or string like '12.0') as tuple of
+        ints without trailing zeros, or None if *value* is not a version
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, six.integer_types):
+        parts = [value]
+    elif isinstance(value, six.string_types):
+        parts = value.strip().split('.')
+        if not all(p.isdigit() for p in parts):
+            return None
+        parts = [int(p) for p in parts]
+    else:
+        return None
+    while parts and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def _parse_version_range(key):
+    """ Parses range key (constraint like '>=12' or tuple of constraints
+        like ('>=12', '<15')) to tuple (low, low_incl, high, high_incl),
+        where None bound means no limit.
+
+        Returns None if *key* is not a range key.
+
+        :raises ValueError: if range is empty (no version satisfies
+                            all constraints)
+    """
+    constraints = [key] if isinstance(key, six.string_types) else key
+    if not isinstance(constraints, (list, tuple)) or not constraints:
+        return None
+    low, low_incl, high, high_incl = None, True, None, True
+    for constraint in constraints:
+        if not isinstance(constraint, six.string_types):
+            return None
+        match = _VERSION_CONSTRAINT_RE.match(constraint)
+        version = _parse_version(match.group(2)) if match else None
+        if version is None:
+            return None
+        op = match.group(1)
+        if op in ('>=', '>', '=='):
+            incl = op != '>'
+            if low is None or version > low or (version == low and
+                                                not incl):
+                low, low_incl = version, incl
+        if op in ('<=', '<', '=='):
+            incl = op != '<'
+            if high is None or version < high or (version == high and
+                                                  not incl):
+                high, high_incl = version, incl
+    if low is not None and high is not None and (
+            low > high or (low == high and not (low_incl and high_incl))):
+        raise ValueError(
+            "Version range %r is empty: no version satisfies all of its "
+            "constraints" % (key,))
+    return low, low_incl, high, high_incl
+
+
+def _get_value_keys(value):
+    """ Returns list of keys defined by value of hash attribute:
+        list of aliases, if *value* is list, or *value* itself.
+        List of version constraints (like ``['>=1', '<3']``)
+        is single range, same as tuple of constraints.
+    """
+    if not isinstance(value, list):
+        return [value]
+    if len(value) > 1 and _parse_version_range(value) is not None:
+        return [tuple(value)]
+    return list(value)
+
+
+class _RangeIndex(object):
+    """ Sorted interval index of version ranges.
+
+        All bounds of ranges are kept in sorted list, that splits versions
+        to segments (bounds themselves and gaps between them).
+        Values of ranges containing each segment are precomputed,
+        so lookup is just a binary search.
+        Exact versions are indexed as ranges with equal bounds.
+    """
+    def __init__(self, ranges):
+        """ :param list ranges: list of pairs (range, values), where range
+                                is result of :func:`_parse_version_range`
+                                and values is list of values to be returned
+                                for versions in this range
+        """
+        points = set()
+        for (low, _, high, _), _ in ranges:
+            points.update(p for p in (low, high) if p is not None)
+        self._points = sorted(points)
+
+        # Segment 2*i is gap before point i, segment 2*i+1 is point i.
+        # Span of segments of each range is found by binary search
+        self._segments = [[] for _ in range(len(self._points) * 2 + 1)]
+        for (low, low_incl, high, high_incl), values in ranges:
+            if low is None:
+                first = 0
+            else:
+                first = bisect.bisect_left(self._points, low) * 2 + (
+                    1 if low_incl else 2)
+            if high is None:
+                last = len(self._segments) - 1
+            else:
+                last = bisect.bisect_left(self._points, high) * 2 + (
+                    1 if high_incl else 0)
+            for i in range(first, last + 1):
+                self._segments[i].extend(values)
+
+    def lookup(self, version):
+        """ Returns list of values of all ranges containing *version*
+            (tuple returned by :func:`_parse_version`)
+        """
+        i = bisect.bisect_left(self._points, version)
+        if i < len(self._points) and self._points[i] == version:
+            return self._segments[i * 2 + 1]
+        return self._segments[i * 2]
+
+
+class _Ready(object):
+    """ Awaitable that is already done with *value*
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raise StopIteration(self.value)
+
+    next = __next__
+
+
+class _ProfileScope(object):
+    """ Context manager (sync and async) that activates extension
+        profile for extension tree. Returned by
+        :meth:`ExtensibleType.activate`
+    """
+    def __init__(self, var, profile):
+        self._var = var
+        self._profile = profile
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(self._var.set(self._profile))
+        return self._profile
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._var.reset(self._tokens.pop())
+
+    def __aenter__(self):
+        return _Ready(self.__enter__())
+
+    def __aexit__(self, exc_type, exc_value, traceback):
+        return _Ready(self.__exit__(exc_type, exc_value, traceback))
+
+
+class _RegistrySnapshot(object):
+    """ Saved state of extension trees. Returned by
+        :meth:`ExtensibleType.snapshot` and :func:`snapshot`.
+        Could be used as context manager, that restores saved
+        state on exit.
+    """
+    def __init__(self, states):
+        self._states = states
+
+    def restore(self):
+        """ Restores state of all trees saved in this snapshot
+        """
+        for tree in self._states:
+            tree.restore(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.restore()
 
 
 class ExtensibleType(type):
@@ -355,27 +733,431 @@ class ExtensibleType(type):
             2
             >>> seq2.count(1)
             2
+
+        Attributes, listed in *merge* attribute of class *Meta*,
+        are merged over all extensions when class is generated.
+        Dictionaries are updated, lists and tuples are concatenated
+        and sets are united in MRO order (base class first)::
+
+            >>> mmc = ExtensibleType._("Model")
+            >>> @six.add_metaclass(mmc)
+            ... class Model(object):
+            ...     class Meta:
+            ...         merge = ('_columns', '_order')
+            ...     _columns = {'id': int}
+            ...     _order = ['id']
+            >>> class ModelName(Model):
+            ...     _columns = {'name': str}
+            ...     _order = ['name']
+            >>> class ModelAge(Model):
+            ...     _columns = {'age': int}
+            >>> Model = mmc.get_class()
+            >>> sorted(Model._columns)
+            ['age', 'id', 'name']
+            >>> Model._order
+            ['id', 'name']
     """
+    # Parent tree, for trees created by *child* method
+    _parent = None
+
+    # Whether some registered class (or its base) declares *Meta.merge*
+    _merge_declared = False
+
     def __new__(mcs, name, bases, attrs):
+        global _classes_created
         cls = super(ExtensibleType, mcs).__new__(mcs, name, bases, attrs)
 
+        # Set of classes in MRO, used by is_subclass / is_instance
+        cls._extension_mro = frozenset(cls.__mro__)
+        _classes_created += 1
+
         if getattr(cls, '_generated', False):
             return cls
 
+        if not mcs._merge_declared and any(
+                getattr(c.__dict__.get('Meta', None), 'merge', None)
+                for c in cls.__mro__):
+            mcs._merge_declared = True
+
         mcs._add_base_class(cls)
 
         return cls
 
+    @classmethod
+    def _init_registry(mcs):
+        """ Initializes state of new extension tree
+        """
+        _trees.add(mcs)
+        mcs._base_classes = []
+        mcs._merge_declared = False
+        mcs._generated_class = None
+        mcs._epoch = 0
+        mcs._disabled = frozenset()
+        mcs._lock = threading.RLock()
+
+        # State of eager regeneration of classes (see *regenerate*
+        # argument of method *_*)
+        mcs._regeneration_pending = False
+        mcs._regeneration_thread = None
+
+        # Profile (set of disabled extensions) activated for current
+        # context, and classes recently generated for activated profiles
+        # (limited by *_class_cache_size*, as well as *_class_cache*)
+        mcs._active_profile = _context_var(
+            'extend_me.profile.%s' % mcs._cls_name)
+        mcs._profile_classes = collections.OrderedDict()
+
+        # Recently generated classes, keyed by tuple of their bases.
+        # Allows to reuse classes when same set of extensions
+        # is requested again (for example after enable / disable)
+        mcs._class_cache = collections.OrderedDict()
+
+        # All alive generated classes, keyed by tuple of their bases.
+        # Keys with same bases share same class as long as it is used,
+        # even if it was evicted from *_class_cache*
+        mcs._shared_classes = weakref.WeakValueDictionary()
+
+        # Classes generated in incremental mode, keyed by
+        # (extension, previously generated class) pair
+        mcs._prefix_classes = weakref.WeakValueDictionary()
+
+        # Active ExtensionProfiler, if any
+        mcs._profiler = None
+
+        # Root class of tree (computed on demand)
+        mcs._root = None
+
+        # Results of checks of virtual subclasses of ABCs used by
+        # is_subclass: {id(klass): (weakref to klass, {cls: result})}.
+        # Valid until ABC cache token changed (token is reset
+        # when tree is changed)
+        mcs._abc_checks = {}
+        mcs._abc_checks_token = None
+
+        # Graph of subclasses used by ABC checks (see _get_abc_graph),
+        # and (ABC cache token, number of created classes) it is valid for
+        mcs._abc_graph = None
+        mcs._abc_graph_stamp = None
+        mcs._abc_subclasses = None
+
+        # Child trees, that overlay this one (see *child* method)
+        mcs._children = weakref.WeakSet()
+
+    @classmethod
+    def _get_registry_state(mcs):
+        """ Returns dict with registry containers of this tree.
+            These containers are replaced, not changed in place,
+            on registration, so no copies are needed
+        """
+        return {
+            '_base_classes': mcs._base_classes,
+            '_disabled': mcs._disabled,
+        }
+
+    @classmethod
+    def _set_registry_state(mcs, state):
+        """ Sets registry containers returned by *_get_registry_state*
+        """
+        with mcs._lock:
+            for name, value in state.items():
+                setattr(mcs, name, value)
+        mcs._invalidate()
+
+    @classmethod
+    def _get_own_base_classes(mcs, name=None):
+        """ Returns classes registered in this tree itself
+            (without classes of parent tree)
+        """
+        return mcs._base_classes
+
+    @classmethod
+    def _get_base_classes(mcs, name=None):
+        bases = mcs._get_own_base_classes(name)
+        if mcs._parent is not None:
+            # Classes of child tree are subclasses of parent's ones
+            bases = bases + mcs._parent._get_base_classes(name)
+        return bases
+
+    @classmethod
+    def _get_root(mcs):
+        """ Returns root class of tree, or None if it is not created yet
+        """
+        root = mcs._root
+        if root is None:
+            bases = mcs._get_base_classes()
+            root = mcs._root = bases[-1] if bases else None
+        return root
+
+    @classmethod
+    def _get_disabled(mcs):
+        """ Returns set of extensions disabled in this tree
+            (or in parent tree)
+        """
+        if mcs._parent is not None:
+            return mcs._disabled.union(mcs._parent._get_disabled())
+        return mcs._disabled
+
+    @classmethod
+    def _is_registered(mcs, cls):
+        return cls in mcs._get_base_classes()
+
+    @classmethod
+    def _get_extensions(mcs):
+        """ Returns list of all classes registered in this tree
+        """
+        res = list(mcs._base_classes)
+        if mcs._parent is not None:
+            res.extend(mcs._parent._get_extensions())
+        return res
+
+    @classmethod
+    def _invalidate(mcs):
+        """ Cleans cache of generated classes
+        """
+        mcs._profile_classes = collections.OrderedDict()
+        mcs._root = None
+        mcs._abc_checks_token = None
+        mcs._epoch += 1
+        if mcs._regenerate == 'lazy' or mcs._generated_class is None:
+            mcs._generated_class = None
+        else:
+            mcs._schedule_regeneration()
+        for child in list(mcs._children):
+            child._invalidate()
+
+    @classmethod
+    def _schedule_regeneration(mcs):
+        """ Regenerates outdated classes according to *regenerate* policy
+            of this tree: right now, or in background thread.
+            Outdated classes will be used until new ones are ready.
+        """
+        if mcs._regenerate == 'sync':
+            mcs._safe_regenerate_classes()
+            return
+        with mcs._lock:
+            mcs._regeneration_pending = True
+            if mcs._regeneration_thread is None:
+                thread = threading.Thread(
+                    target=mcs._regeneration_worker,
+                    name='extend_me-regenerate-%s' % mcs._cls_name)
+                thread.daemon = True
+                mcs._regeneration_thread = thread
+                thread.start()
+
+    @classmethod
+    def _regeneration_worker(mcs):
+        while True:
+            with mcs._lock:
+                if not mcs._regeneration_pending:
+                    mcs._regeneration_thread = None
+                    return
+                mcs._regeneration_pending = False
+            mcs._safe_regenerate_classes()
+
+    @classmethod
+    def _safe_regenerate_classes(mcs):
+        try:
+            mcs._regenerate_classes()
+        except Exception:
+            # Class could not be built (for example because of MRO
+            # conflict). Fallback to lazy generation, that will raise
+            # same error on next request of class.
+            with mcs._lock:
+                mcs._drop_outdated_classes()
+
+    @classmethod
+    def _regenerate_classes(mcs):
+        """ Builds new classes instead of outdated ones, and replaces
+            them, if tree was not changed while classes were built.
+        """
+        epoch = mcs._epoch
+        cls = mcs._build_class(mcs._get_active_bases())
+        with mcs._lock:
+            if epoch == mcs._epoch:
+                mcs._generated_class = cls
+
+    @classmethod
+    def _drop_outdated_classes(mcs):
+        mcs._generated_class = None
+
+    @classmethod
+    def wait_regeneration(mcs, timeout=None):
+        """ Waits until background regeneration of classes is finished.
+            Makes sense only for trees created with
+            ``regenerate='background'`` (see :meth:`_`)
+
+            :param float timeout: timeout in seconds (default: no timeout)
+            :return: True if there is no regeneration in progress
+        """
+        thread = mcs._regeneration_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
     @classmethod
     def _add_base_class(mcs, cls):
         # Do all magic only if subclass had defined required attributes
         if getattr(mcs, '_cls_name', None):
             if cls not in mcs._base_classes:
-                mcs._base_classes.insert(0, cls)
-                mcs._generated_class = None  # Clean cache
+                # Registry containers are never changed in place,
+                # so snapshots could just keep references to them
+                mcs._base_classes = [cls] + mcs._base_classes
+                mcs._invalidate()
+                if mcs._profiler is not None:
+                    mcs._profiler._instrument(cls)
+
+    @classmethod
+    def _resolve_key(mcs, name, default=False):
+        """ Returns key class requested for key *name* have to be
+            generated for. Keys are not used by this tree, so *name*
+            is returned as is
+        """
+        return name
+
+    @classmethod
+    def _get_active_bases(mcs, name=None, profile=None):
+        """ Returns tuple of enabled base classes for class to be generated
+        """
+        bases = mcs._get_base_classes(name)
+        disabled = mcs._get_disabled()
+        if profile:
+            disabled = disabled.union(profile)
+        if disabled:
+            return tuple(b for b in bases if b not in disabled)
+        return tuple(bases)
+
+    @classmethod
+    def _build_class(mcs, bases):
+        """ Returns class generated for *bases*.
+
+            Last *_class_cache_size* generated classes are cached,
+            so no new class will be created if it was generated
+            for same bases recently. Also no new class will be created
+            while class generated for same bases is alive.
+        """
+        with mcs._lock:
+            cls = mcs._lru_get(mcs._class_cache, bases)
+            if cls is None:
+                cls = mcs._shared_classes.get(bases, None)
+            if cls is None:
+                if mcs._incremental:
+                    cls = mcs._compose_incremental(bases)
+                else:
+                    cls = mcs._compose(bases)
+                mcs._shared_classes[bases] = cls
+            mcs._lru_put(mcs._class_cache, bases, cls)
+            return cls
+
+    @classmethod
+    def _lru_get(mcs, cache, key):
+        """ Returns value for *key* from LRU cache *cache* (OrderedDict),
+            or None if there is no such key.
+
+            Hits are not locked and do not change order of values,
+            so LRU is approximate: value used often is evicted when it
+            becomes oldest stored one, and stored again on next miss.
+        """
+        return cache.get(key, None)
 
     @classmethod
-    def _(mcs, cls_name="Object", with_meta=None):
+    def _lru_put(mcs, cache, key, value):
+        """ Stores *value* in LRU cache *cache* (OrderedDict), removing
+            least recently used values over *_class_cache_size*
+        """
+        with mcs._lock:
+            cache[key] = value
+            if mcs._class_cache_size is not None:
+                while len(cache) > mcs._class_cache_size:
+                    cache.popitem(last=False)
+
+    @classmethod
+    def _compose(mcs, bases):
+        """ Creates new class with specified *bases*
+        """
+        cls = type(mcs._cls_name, bases, {
+            '_generated': True,
+            # Tree that generated class (metaclass of class may be
+            # metaclass of parent tree, see *child* method)
+            '_extension_tree': mcs,
+            # Values computed by class_cached descriptors
+            '_class_cached_values': {},
+        })
+        for name, value in mcs._merge_attributes(cls).items():
+            setattr(cls, name, value)
+        return cls
+
+    @classmethod
+    def _merge_attributes(mcs, cls):
+        """ Merges values of attributes listed in *Meta.merge*
+            of classes in MRO of generated class *cls*
+
+            :return: dict {name: merged value}
+        """
+        tree = mcs
+        while not tree._merge_declared:
+            # Most trees do not merge attributes at all,
+            # so MRO is not scanned for them
+            tree = tree._parent
+            if tree is None:
+                return {}
+
+        # Other generated classes (in incremental mode) contain already
+        # merged values, so only extensions have to be taken into account
+        mro = [c for c in reversed(cls.__mro__)
+               if not c.__dict__.get('_generated', False)]
+
+        names = []
+        for klass in mro:
+            meta = klass.__dict__.get('Meta', None)
+            for name in getattr(meta, 'merge', ()):
+                if name not in names:
+                    names.append(name)
+
+        res = {}
+        for name in names:
+            values = [c.__dict__[name] for c in mro if name in c.__dict__]
+            if not values:
+                continue
+            value = values[0]
+            if isinstance(value, dict):
+                merged = type(value)()
+                for val in values:
+                    merged.update(val)
+            elif isinstance(value, (list, tuple)):
+                merged = type(value)(item for val in values for item in val)
+            elif isinstance(value, (set, frozenset)):
+                merged = type(value)().union(*values)
+            else:
+                raise TypeError(
+                    "Attribute '%s' of type '%s' could not be merged" % (
+                        name, type(value).__name__))
+            res[name] = merged
+        return res
+
+    @classmethod
+    def _compose_incremental(mcs, bases):
+        """ Creates class for *bases* as chain of generated classes,
+            where each class inherits from one extension and class
+            generated for all previous extensions. Classes generated
+            for previous extensions are reused, so adding new extension
+            requires creation of only one new class with two bases,
+            instead of computing MRO over all extensions at once.
+        """
+        cls = None
+        for base in reversed(bases):
+            key = (base, cls)
+            next_cls = mcs._prefix_classes.get(key, None)
+            if next_cls is None:
+                next_cls = mcs._compose(
+                    (base,) if cls is None else (base, cls))
+                mcs._prefix_classes[key] = next_cls
+            cls = next_cls
+        return cls
+
+    @classmethod
+    def _(mcs, cls_name="Object", with_meta=None,
+          cache_size=_CLASS_CACHE_SIZE, incremental=False, regenerate='lazy'):
         """ Method to generate real metaclass to be used::
 
                 mc = ExtensibleType._("MyClass")  # note this line
@@ -386,20 +1168,93 @@ class ExtensibleType(type):
             :param str cls_name: name of generated class
             :param class with_meta: Mix aditional metaclass in.
                                     (default: None)
+            :param int cache_size: number of recently generated classes
+                                   to keep for reuse (for example, when
+                                   extensions are disabled and enabled
+                                   back). None means no limit.
+                                   (default: 128)
+            :param bool incremental: if set to True, classes will be
+                                     composed incrementally: class for
+                                     new extension inherits from it and
+                                     from class generated before it was
+                                     registered. This makes adding
+                                     extensions to large trees much
+                                     cheaper, but generated class will
+                                     have only two direct bases and
+                                     longer MRO. (default: False)
+            :param str regenerate: policy of regeneration of classes
+                                   after tree changed (new extension
+                                   registered, enabled or disabled):
+
+                                   - 'lazy': class is regenerated on
+                                     next request (default)
+                                   - 'sync': already generated classes
+                                     are regenerated immediately
+                                   - 'background': already generated
+                                     classes are regenerated in background
+                                     thread, while old classes are
+                                     returned until new ones are ready
+
             :return: specific metaclass to track new inheritance tree
+
+            Incremental composition example::
+
+                >>> mc = ExtensibleType._("IncObject", incremental=True)
+                >>> @six.add_metaclass(mc)
+                ... class IncObject(object):
+                ...     pass
+                >>> class IncExt1(IncObject):
+                ...     def method1(self):
+                ...         return "ext1"
+                >>> cls1 = mc.get_class()
+                >>> class IncExt2(IncObject):
+                ...     def method1(self):
+                ...         return "ext2+" + super(IncExt2, self).method1()
+                >>> cls2 = mc.get_class()
+                >>> cls2().method1()
+                'ext2+ext1'
+                >>> cls2.__bases__ == (IncExt2, cls1)
+                True
+
+            Background regeneration example::
+
+                >>> mc = ExtensibleType._("BgObject", regenerate='background')
+                >>> @six.add_metaclass(mc)
+                ... class BgObject(object):
+                ...     pass
+                >>> cls1 = mc.get_class()
+                >>> class BgExt(BgObject):
+                ...     pass
+                >>> mc.wait_regeneration()
+                True
+                >>> cls2 = mc.get_class()
+                >>> cls2 is cls1
+                False
+                >>> BgExt in cls2.__bases__
+                True
         """
-        if with_meta is not None:
-            class EXType(with_meta, mcs):
-                _cls_name = cls_name
-                _base_classes = []
-                _generated_class = None
-        else:
-            class EXType(mcs):
-                _cls_name = cls_name
-                _base_classes = []
-                _generated_class = None
+        return mcs._new_tree('EXType', cls_name, with_meta, cache_size,
+                             incremental, regenerate)
 
-        return EXType
+    @classmethod
+    def _new_tree(mcs, name, cls_name, with_meta, cache_size, incremental,
+                  regenerate, **attrs):
+        """ Creates and initializes metaclass *name* of new extension
+            tree (see :meth:`_` for description of arguments).
+            *attrs* are additional attributes of metaclass, that have
+            to be set before registry is initialized
+        """
+        if regenerate not in _REGENERATE_POLICIES:
+            raise ValueError(
+                "Unknown regeneration policy '%s'" % regenerate)
+        attrs.update(_cls_name=cls_name,
+                     _class_cache_size=cache_size,
+                     _incremental=incremental,
+                     _regenerate=regenerate)
+        bases = (mcs,) if with_meta is None else (with_meta, mcs)
+        tree = type(name, bases, attrs)
+        tree._init_registry()
+        return tree
 
     @classmethod
     def get_class(mcs):
@@ -414,13 +1269,23 @@ class ExtensibleType(type):
                 # get class with all extensions enabled
                 MyClass = mc.get_class()
 
+            If some profile is activated in current context
+            (see :meth:`activate`), then class generated for
+            this profile will be returned.
         """
-        if mcs._generated_class is None:
-            mcs._generated_class = type(
-                mcs._cls_name,
-                tuple(mcs._base_classes),
-                {'_generated': True})
-        return mcs._generated_class
+        profile = mcs._active_profile.get()
+        if profile is not None:
+            cls = mcs._lru_get(mcs._profile_classes, profile)
+            if cls is None:
+                cls = mcs._build_class(mcs._get_active_bases(profile=profile))
+                mcs._lru_put(mcs._profile_classes, profile, cls)
+            return cls
+
+        cls = mcs._generated_class
+        if cls is None:
+            cls = mcs._build_class(mcs._get_active_bases())
+            mcs._generated_class = cls
+        return cls
 
     @classmethod
     def get_object(mcs, *args, **kwargs):
@@ -433,6 +1298,738 @@ class ExtensibleType(type):
         """
         return mcs.get_class()(*args, **kwargs)
 
+    @classmethod
+    def profile(mcs, memory=False):
+        """ Returns :class:`ExtensionProfiler` for this tree.
+            Inside ``with`` block methods of all extensions are
+            instrumented to collect call counts, wall time and
+            (optionally) memory allocations for each extension::
+
+                >>> mc = ExtensibleType._("ProfiledObject")
+                >>> @six.add_metaclass(mc)
+                ... class ProfiledObject(object):
+                ...     def method1(self):
+                ...         return 1
+                >>> class ProfiledExt(ProfiledObject):
+                ...     def method1(self):
+                ...         return super(ProfiledExt, self).method1() + 1
+                >>> with mc.profile() as profiler:
+                ...     mc.get_object().method1()
+                2
+                >>> stats = sorted(profiler.get_stats(),
+                ...                key=lambda s: s['extension'])
+                >>> [(s['extension'].split('.')[-1], s['calls'])
+                ...  for s in stats]
+                [('ProfiledExt', 1), ('ProfiledObject', 1)]
+
+            :param bool memory: if set to True, then memory allocations
+                                will be traced with *tracemalloc*
+                                (default: False)
+            :return: ExtensionProfiler instance
+        """
+        return ExtensionProfiler(mcs, memory=memory)
+
+    @classmethod
+    def _check_extensions(mcs, extensions):
+        for ext in extensions:
+            if not mcs._is_registered(ext):
+                raise ValueError(
+                    "Class '%s' is not registered in extension tree "
+                    "of '%s'" % (ext.__name__, mcs._cls_name))
+            if ext is mcs._get_root():
+                raise ValueError(
+                    "Root class '%s' could not be disabled" % ext.__name__)
+
+    @classmethod
+    def disable(mcs, *extensions):
+        """ Disables extensions, so they will not be used as base classes
+            for classes generated after this call::
+
+                >>> mc = ExtensibleType._("ToggleObject")
+                >>> @six.add_metaclass(mc)
+                ... class ToggleObject(object):
+                ...     pass
+                >>> class ToggleExtA(ToggleObject):
+                ...     pass
+                >>> class ToggleExtB(ToggleObject):
+                ...     pass
+                >>> cls_all = mc.get_class()
+                >>> [b.__name__ for b in cls_all.__bases__]
+                ['ToggleExtB', 'ToggleExtA', 'ToggleObject']
+                >>> mc.disable(ToggleExtA)
+                >>> mc.is_enabled(ToggleExtA)
+                False
+                >>> [b.__name__ for b in mc.get_class().__bases__]
+                ['ToggleExtB', 'ToggleObject']
+
+            Classes generated for each set of enabled extensions are
+            cached, so switching extensions back does not create
+            new class:
+
+                >>> mc.enable(ToggleExtA)
+                >>> mc.get_class() is cls_all
+                True
+
+            Note, that extension remains in MRO of generated class
+            if some of enabled extensions inherits from it.
+
+            :param extensions: extension classes to disable
+            :raises ValueError: if some of classes is not registered
+                                in this tree or is root class of tree
+        """
+        mcs._check_extensions(extensions)
+        mcs._disabled = mcs._disabled.union(extensions)
+        mcs._invalidate()
+
+    @classmethod
+    def enable(mcs, *extensions):
+        """ Enables extensions previously disabled by :meth:`disable`
+
+            :param extensions: extension classes to enable
+            :raises ValueError: if some of classes is not registered
+                                in this tree
+        """
+        mcs._check_extensions(extensions)
+        mcs._disabled = mcs._disabled.difference(extensions)
+        mcs._invalidate()
+
+    @classmethod
+    def is_enabled(mcs, extension):
+        """ Checks if *extension* is not disabled by :meth:`disable`
+        """
+        return extension not in mcs._get_disabled()
+
+    @classmethod
+    def activate(mcs, profile):
+        """ Returns context manager, that activates extension *profile*
+            for current context. Profile is collection of extensions that
+            have to be disabled inside the scope, in addition to ones
+            disabled by :meth:`disable`.
+
+            Active profile is stored in *contextvars.ContextVar*
+            (or in thread local storage on Python versions without
+            *contextvars*), so concurrent threads and asyncio tasks may
+            use different profiles at same time. Both ``with`` and
+            ``async with`` statements are supported::
+
+                >>> mc = ExtensibleType._("ProfileObject")
+                >>> @six.add_metaclass(mc)
+                ... class ProfileObject(object):
+                ...     pass
+                >>> class ProfileExtA(ProfileObject):
+                ...     pass
+                >>> class ProfileExtB(ProfileObject):
+                ...     pass
+                >>> tenant_a = [ProfileExtB]
+                >>> with mc.activate(tenant_a):
+                ...     [b.__name__ for b in mc.get_class().__bases__]
+                ['ProfileExtA', 'ProfileObject']
+                >>> [b.__name__ for b in mc.get_class().__bases__]
+                ['ProfileExtB', 'ProfileExtA', 'ProfileObject']
+
+            Classes generated for each profile are cached, so lookup
+            of class for active profile is cheap:
+
+                >>> with mc.activate(tenant_a):
+                ...     cls = mc.get_class()
+                >>> with mc.activate(tenant_a):
+                ...     mc.get_class() is cls
+                True
+
+            ``async with`` awaits results of *__aenter__* and
+            *__aexit__*, that are already done:
+
+                >>> def await_(awaitable):
+                ...     try:
+                ...         next(awaitable.__await__())
+                ...     except StopIteration as e:
+                ...         return e.args[0] if e.args else None
+                >>> scope = mc.activate(tenant_a)
+                >>> await_(scope.__aenter__()) == frozenset(tenant_a)
+                True
+                >>> mc.get_class() is cls
+                True
+                >>> await_(scope.__aexit__(None, None, None))
+                >>> [b.__name__ for b in mc.get_class().__bases__]
+                ['ProfileExtB', 'ProfileExtA', 'ProfileObject']
+
+            :param profile: collection of extension classes to disable,
+                            or None to use default set of extensions
+            :return: context manager
+            :raises ValueError: if some of classes is not registered
+                                in this tree or is root class of tree
+        """
+        if profile is not None:
+            profile = frozenset(profile)
+            mcs._check_extensions(profile)
+        return _ProfileScope(mcs._active_profile, profile or None)
+
+    @classmethod
+    def is_subclass(mcs, klass, cls=None):
+        """ Fast equivalent of ``issubclass(klass, cls)``, where *cls*
+            is one of classes of this tree (root class by default).
+
+            Result is looked up in set of classes in MRO of *klass*,
+            precomputed when *klass* is created, so check does not
+            depend on number of extensions and generated classes.
+            For trees created with ABC metaclass (see *with_meta*
+            argument of :meth:`_`) negative results are checked same
+            way as *ABCMeta* does (taking into account *__subclasshook__*
+            and registered virtual subclasses of *cls* and its
+            subclasses), but generated classes without registered
+            virtual subclasses and own *__subclasshook__* are skipped,
+            and each subclass is checked only once. Results are cached
+            until new virtual subclass registered for any ABC, or this
+            tree changed::
+
+                >>> mc = ExtensibleType._("FastCheck", with_meta=abc.ABCMeta)
+                >>> @six.add_metaclass(mc)
+                ... class FastCheck(object):
+                ...     pass
+                >>> class FastCheckExt(FastCheck):
+                ...     pass
+                >>> obj = mc.get_object()
+                >>> mc.is_instance(obj), mc.is_instance(obj, FastCheckExt)
+                (True, True)
+                >>> mc.is_instance(42)
+                False
+                >>> _ = FastCheck.register(int)
+                >>> mc.is_instance(42)
+                True
+                >>> mc.is_subclass(int, FastCheckExt)
+                False
+                >>> _ = mc.get_class().register(float)
+                >>> mc.is_instance(4.2), mc.is_instance(4.2, FastCheckExt)
+                (True, True)
+
+            *__subclasshook__* of subclass returning False excludes its
+            subclasses from check, as for *ABCMeta*::
+
+                >>> class FastCheckHook(FastCheck):
+                ...     @classmethod
+                ...     def __subclasshook__(cls, klass):
+                ...         if cls is FastCheckHook and klass is complex:
+                ...             return False
+                ...         return NotImplemented
+                >>> class FastCheckHookSub(FastCheckHook):
+                ...     pass
+                >>> _ = FastCheckHookSub.register(complex)
+                >>> mc.is_instance(1j), isinstance(1j, FastCheck)
+                (False, False)
+                >>> mc.is_instance(1j, FastCheckHookSub)
+                True
+
+            :param class klass: class to check
+            :param class cls: class of this tree to check against
+                              (default: root class of tree)
+            :return: True if *klass* is subclass of *cls*
+        """
+        if cls is None:
+            cls = mcs._root or mcs._get_root()
+        # Only classes created by extension trees may be real
+        # subclasses of *cls*
+        if isinstance(klass, ExtensibleType) and cls in klass._extension_mro:
+            return True
+        if not isinstance(cls, abc.ABCMeta):
+            return False
+        return mcs._is_virtual_subclass(klass, cls)
+
+    @classmethod
+    def _is_virtual_subclass(mcs, klass, cls):
+        """ Checks if *klass* is virtual subclass of ABC *cls*.
+            Result is cached until new virtual subclass registered
+            for any ABC, or this tree changed.
+        """
+        if mcs._abc_checks_token != _abc_cache_token():
+            mcs._abc_checks = {}
+            mcs._abc_checks_token = _abc_cache_token()
+        checks = mcs._abc_checks
+        entry = checks.get(id(klass), None)
+        if entry is None or entry[0]() is not klass:
+            ref = weakref.ref(
+                klass, functools.partial(_drop_key, checks, id(klass)))
+            entry = checks[id(klass)] = (ref, {})
+        result = entry[1].get(cls, None)
+        if result is None:
+            result = _check_abc_subclass(
+                klass, cls, entry[1], mcs._get_abc_graph())
+            if result is None:
+                # Unknown implementation of ABC
+                result = issubclass(klass, cls)
+            entry[1][cls] = result
+        return result
+
+    @classmethod
+    def _get_abc_graph(mcs):
+        """ Returns graph of subclasses of root class of this tree
+            (including generated classes, and classes of child trees),
+            that may affect ABC checks: {class: set of direct subclasses}.
+
+            Classes with default *__subclasshook__*, no registered virtual
+            subclasses and no subclasses could not make any class their
+            virtual subclass, so they are excluded. Usually these are all
+            generated classes, so graph contains only extensions.
+
+            :return: graph, or None if registry of some class is not known
+        """
+        token = _abc_cache_token()
+        if mcs._abc_graph_stamp == (token, _classes_created):
+            return mcs._abc_graph
+
+        # Classes that are kept in graph regardless of registries
+        # are changed only when new classes are created
+        if (mcs._abc_graph_stamp is None or
+                mcs._abc_graph_stamp[1] != _classes_created):
+            mcs._abc_subclasses = mcs._get_abc_subclasses()
+        subclasses, leaves = mcs._abc_subclasses
+
+        graph = dict(subclasses)
+        for klass in leaves:
+            registry = _abc_registry(klass)
+            if registry is None:
+                graph = None
+                break
+            if registry:
+                # Leaf with registered virtual subclasses
+                graph[klass] = []
+                for base in klass.__bases__:
+                    if base in subclasses:
+                        graph[base] = graph[base] + [klass]
+        mcs._abc_graph = graph
+        mcs._abc_graph_stamp = (token, _classes_created)
+        return graph
+
+    @classmethod
+    def _get_abc_subclasses(mcs):
+        """ Returns pair (subclasses, leaves) of subclasses of root class
+            of this tree: *subclasses* is dict {class: direct subclasses}
+            for classes, that have to be checked by ABC checks anyway
+            (classes with subclasses or own *__subclasshook__*, only
+            such subclasses are listed), and *leaves* is list of other
+            classes, that have to be checked only if they have registered
+            virtual subclasses.
+        """
+        root = mcs._root or mcs._get_root()
+        subclasses, leaves = {}, []
+        seen = set()
+        frontier = [root] if root is not None else []
+        while frontier:
+            found = set()
+            for klass in frontier:
+                subs = klass.__subclasses__()
+                if (subs or klass is root or
+                        hasattr(klass.__subclasshook__, '__func__')):
+                    subclasses[klass] = subs
+                    found.update(subs)
+                else:
+                    leaves.append(klass)
+            seen.update(frontier)
+            frontier = list(found.difference(seen))
+        for klass, subs in subclasses.items():
+            subclasses[klass] = [k for k in subs if k in subclasses]
+        return subclasses, leaves
+
+    @classmethod
+    def is_instance(mcs, obj, cls=None):
+        """ Fast equivalent of ``isinstance(obj, cls)``, where *cls*
+            is one of classes of this tree (root class by default).
+            See :meth:`is_subclass`
+
+            :param obj: object to check
+            :param class cls: class of this tree to check against
+                              (default: root class of tree)
+            :return: True if *obj* is instance of *cls*
+        """
+        # Same as is_subclass(type(obj), cls), inlined as it is hot path
+        if cls is None:
+            cls = mcs._root or mcs._get_root()
+        klass = type(obj)
+        if isinstance(klass, ExtensibleType) and cls in klass._extension_mro:
+            return True
+        if isinstance(cls, abc.ABCMeta):
+            # Cached result of check of virtual subclass, if any
+            entry = mcs._abc_checks.get(id(klass), None)
+            result = None
+            if (entry is not None and entry[0]() is klass and
+                    mcs._abc_checks_token == _abc_cache_token()):
+                result = entry[1].get(cls, None)
+            if result is None:
+                result = mcs._is_virtual_subclass(klass, cls)
+            if result:
+                return True
+        proxy = getattr(obj, '__class__', klass)
+        if proxy is not klass:
+            return mcs.is_subclass(proxy, cls)
+        return False
+
+    @classmethod
+    def get_epoch(mcs):
+        """ Returns registry epoch: counter that is incremented each time
+            set of extensions of this tree is changed (new extension
+            registered, or some of extensions enabled or disabled).
+
+            May be used to cheaply check if anything was changed in tree
+            since some moment::
+
+                >>> mc = ExtensibleType._("EpochObject")
+                >>> mc.get_epoch()
+                0
+                >>> @six.add_metaclass(mc)
+                ... class EpochObject(object):
+                ...     pass
+                >>> mc.get_epoch()
+                1
+                >>> class EpochObjectExt(EpochObject):
+                ...     pass
+                >>> mc.get_epoch()
+                2
+        """
+        return mcs._epoch
+
+    @classmethod
+    def fingerprint(mcs, key=None, source=False):
+        """ Returns stable fingerprint (hex string) of ordered set of
+            extensions, class generated for *key* is built of.
+            Only name of generated class and module and qualified names
+            of extensions (and hashes of their source code if *source*
+            is True) are used, so fingerprint is same in different
+            processes, and may be used as key of external caches,
+            that have to be invalidated when set of extensions changes::
+
+                >>> mc = ExtensibleType._("FingerprintObject")
+                >>> @six.add_metaclass(mc)
+                ... class FingerprintObject(object):
+                ...     pass
+                >>> fp = mc.fingerprint()
+                >>> len(fp)
+                64
+                >>> fp == mc.fingerprint()
+                True
+                >>> class FingerprintObjectExt(FingerprintObject):
+                ...     pass
+                >>> fp == mc.fingerprint()
+                False
+                >>> mc.disable(FingerprintObjectExt)
+                >>> fp == mc.fingerprint()
+                True
+
+            Extensions disabled by profile activated in current context
+            (see :meth:`activate`) are taken into account too.
+
+            For :class:`ExtensibleByHashType` unregistered *key* is
+            rejected same way as by *get_class*::
+
+                >>> hmc = ExtensibleByHashType._("FingerprintKeyed",
+                ...                              hashattr='name')
+                >>> @six.add_metaclass(hmc)
+                ... class FingerprintKeyed(object):
+                ...     pass
+                >>> len(hmc.fingerprint())
+                64
+                >>> hmc.fingerprint('unknown')
+                Traceback (most recent call last):
+                ...
+                ValueError: There is no class registered for key 'unknown'
+
+            :param key: key of generated class
+                        (only for :class:`ExtensibleByHashType`)
+            :param bool source: include hashes of source code of extensions
+            :return: hex digest of SHA-256 hash
+            :raises ValueError: if there is no class registered for *key*
+                                (same as :meth:`get_class`)
+        """
+        if key is not None:
+            key = mcs._resolve_key(key)
+        bases = mcs._get_active_bases(key, mcs._active_profile.get())
+        digest = hashlib.sha256(mcs._cls_name.encode('utf-8'))
+        for base in bases:
+            name = '%s:%s' % (base.__module__, _qualname(base))
+            if source:
+                name += ':' + _source_hash(base)
+            digest.update(b'\0' + name.encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def snapshot(mcs):
+        """ Saves state of this extension tree (registered and
+            disabled extensions), to be restored later by
+            :meth:`restore`. Takes constant time, as registry containers
+            are not copied, but shared with snapshot (and copied on
+            first change after it).
+
+            Useful to isolate tests, that define extensions::
+
+                >>> mc = ExtensibleType._("SnapshotObject")
+                >>> @six.add_metaclass(mc)
+                ... class SnapshotObject(object):
+                ...     pass
+                >>> snap = mc.snapshot()
+                >>> class SnapshotObjectExt(SnapshotObject):
+                ...     def method1(self):
+                ...         return "Test"
+                >>> mc.get_object().method1()
+                'Test'
+                >>> mc.restore(snap)
+                >>> hasattr(mc.get_object(), 'method1')
+                False
+
+            Snapshot could be used as context manager too, restoring
+            state on exit::
+
+                >>> with mc.snapshot():
+                ...     class SnapshotObjectExt2(SnapshotObject):
+                ...         pass
+                ...     len(mc.get_class().__bases__)
+                2
+                >>> len(mc.get_class().__bases__)
+                1
+
+            See also :func:`snapshot` and :func:`restore` to save
+            state of all extension trees.
+
+            :return: snapshot object
+        """
+        return _RegistrySnapshot({mcs: mcs._get_registry_state()})
+
+    @classmethod
+    def restore(mcs, snapshot):
+        """ Restores state of this extension tree saved by
+            :meth:`snapshot` (or by :func:`snapshot`).
+            Classes generated for restored state are rebuilt on demand
+            (usually taken from cache of recently generated classes),
+            or right away for trees with eager regeneration policy
+            (see *regenerate* argument of :meth:`_`). Keys registered
+            after snapshot are not known anymore in any case::
+
+                >>> mc = ExtensibleByHashType._("RestoreSync",
+                ...                             hashattr='name',
+                ...                             regenerate='sync')
+                >>> @six.add_metaclass(mc)
+                ... class RestoreSync(object):
+                ...     pass
+                >>> snap = mc.snapshot()
+                >>> class RestoreSyncX(RestoreSync):
+                ...     class Meta:
+                ...         name = 'x'
+                >>> RestoreSyncX in mc.get_class('x').__bases__
+                True
+                >>> mc.restore(snap)
+                >>> mc.get_registered_names()
+                []
+                >>> mc.get_class('x')
+                Traceback (most recent call last):
+                ...
+                ValueError: There is no class registered for key 'x'
+
+            Registry of keys is shared with snapshot, and copied on first
+            change after it, so extensions registered after snapshot
+            for already known keys are dropped as well. Same snapshot
+            could be restored several times::
+
+                >>> class RestoreSyncA(RestoreSync):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> snap = mc.snapshot()
+                >>> class RestoreSyncA2(RestoreSync):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> mc.get_class('a').__bases__[:2] == (RestoreSyncA2,
+                ...                                     RestoreSyncA)
+                True
+                >>> mc.restore(snap)
+                >>> mc.get_class('a').__bases__ == (RestoreSyncA, RestoreSync)
+                True
+                >>> class RestoreSyncA3(RestoreSync):
+                ...     class Meta:
+                ...         name = ['a', 'y']
+                >>> sorted(mc.get_registered_names())
+                ['a', 'y']
+                >>> mc.restore(snap)
+                >>> mc.get_registered_names()
+                ['a']
+                >>> mc.get_class('a').__bases__ == (RestoreSyncA, RestoreSync)
+                True
+
+            :param snapshot: snapshot object
+            :raises ValueError: if *snapshot* does not contain state
+                                of this tree
+        """
+        state = snapshot._states.get(mcs, None)
+        if state is None:
+            raise ValueError(
+                "Snapshot does not contain state of extension tree "
+                "'%s'" % mcs._cls_name)
+        mcs._set_registry_state(state)
+
+    @classmethod
+    def child(mcs, cls_name=None):
+        """ Creates child extension tree, that overlays this one.
+            Child tree uses all extensions of this (parent) tree,
+            without copying them, and extensions registered in child tree
+            itself. Extensions of child tree are not visible in parent
+            tree, so several applications in one process may share same
+            core set of extensions, each adding its own ones.
+
+            Child tree has its own cache of generated classes, that is
+            invalidated automatically when parent tree changes.
+
+            Child tree metaclass is subclass of parent one, so to register
+            extensions in child tree, use it as metaclass of any subclass of
+            parent's classes (subclasses of such class will be registered
+            in child tree automatically). Use *six.with_metaclass* (not
+            *six.add_metaclass*, that creates class with parent's metaclass
+            first)::
+
+                >>> mc = ExtensibleType._("LayeredObject")
+                >>> @six.add_metaclass(mc)
+                ... class LayeredObject(object):
+                ...     def hello(self):
+                ...         return 'core'
+                >>> app_mc = mc.child()
+                >>> class LayeredObjectApp(six.with_metaclass(app_mc,
+                ...                                           LayeredObject)):
+                ...     def hello(self):
+                ...         return 'app+' + super(LayeredObjectApp,
+                ...                               self).hello()
+                >>> mc.get_object().hello()
+                'core'
+                >>> app_mc.get_object().hello()
+                'app+core'
+
+            New extensions of parent tree are seen by child tree::
+
+                >>> class LayeredObjectExt(LayeredObject):
+                ...     def hello(self):
+                ...         return 'ext+' + super(LayeredObjectExt,
+                ...                               self).hello()
+                >>> app_mc.get_object().hello()
+                'app+ext+core'
+
+            Extensions of parent tree could be disabled only in child tree:
+
+                >>> app_mc.disable(LayeredObjectExt)
+                >>> app_mc.get_object().hello()
+                'app+core'
+                >>> mc.get_object().hello()
+                'ext+core'
+
+            Objects created by child tree are always upgraded
+            (see :meth:`upgrade`) by child tree, even through parent:
+
+                >>> obj = app_mc.get_object()
+                >>> class LayeredObjectExt2(LayeredObject):
+                ...     pass
+                >>> mc.upgrade(obj)
+                True
+                >>> obj.hello()
+                'app+core'
+
+            :param str cls_name: name of classes generated by child tree
+                                 (default: same as in parent tree)
+            :return: metaclass of child extension tree
+        """
+        class EXChildType(mcs):
+            _parent = mcs
+
+        if cls_name is not None:
+            EXChildType._cls_name = cls_name
+        EXChildType._init_registry()
+        mcs._children.add(EXChildType)
+        return EXChildType
+
+    @classmethod
+    def _get_current_class(mcs, cls):
+        """ Returns class, that have to be used now instead of *cls*
+        """
+        return mcs.get_class()
+
+    @classmethod
+    def _get_current_classes(mcs, cls):
+        """ Returns set of classes, that may have to be used now instead
+            of *cls* (several classes if current class is ambiguous)
+        """
+        return set([mcs._get_current_class(cls)])
+
+    @classmethod
+    def _check_object(mcs, obj):
+        """ Returns tree, that created object *obj*: this tree
+            or one of its child trees (see :meth:`child`)
+
+            :raises ValueError: if *obj* does not belong to this tree
+        """
+        tree = _find_object_tree(obj)
+        if tree is None or not issubclass(tree, mcs):
+            raise ValueError(
+                "Object %r does not belong to extension tree of '%s'" % (
+                    obj, mcs._cls_name))
+        return tree
+
+    @classmethod
+    def is_stale(mcs, obj):
+        """ Checks if object *obj* was created before some extensions
+            were registered, so its class is not same as class
+            that will be generated now.
+
+            :param obj: object created by this extension tree
+                        (or by its child tree, then child tree is used)
+            :return: True if object's class is outdated (also if its
+                     class was shared by several keys of
+                     :class:`ExtensibleByHashType`, that resolve to
+                     different classes now)
+            :raises ValueError: if *obj* does not belong to this tree
+        """
+        tree = mcs._check_object(obj)
+        return tree._get_current_classes(type(obj)) != set([type(obj)])
+
+    @classmethod
+    def upgrade(mcs, obj):
+        """ Moves object *obj* to current generated class in place
+            (by changing its *__class__*), so it gets all
+            extensions registered after it was created::
+
+                >>> mc = ExtensibleType._("UpgradeObject")
+                >>> @six.add_metaclass(mc)
+                ... class UpgradeObject(object):
+                ...     pass
+                >>> obj = mc.get_object()
+                >>> mc.is_stale(obj)
+                False
+                >>> class UpgradeObjectExt(UpgradeObject):
+                ...     def method1(self):
+                ...         return "Test"
+                >>> mc.is_stale(obj)
+                True
+                >>> mc.upgrade(obj)
+                True
+                >>> obj.method1()
+                'Test'
+                >>> mc.is_stale(obj)
+                False
+                >>> mc.upgrade(obj)
+                False
+
+            Note, that instance state is not changed, so
+            *__init__* of new extensions will not be called.
+
+            :param obj: object created by this extension tree
+                        (or by its child tree, then child tree is used)
+            :return: True if object was upgraded,
+                     False if it already has current class
+            :raises ValueError: if *obj* does not belong to this tree,
+                                or current class of object is ambiguous
+                                (see :meth:`is_stale`)
+            :raises TypeError: if layout of current generated class
+                               is not compatible with layout of
+                               object's class (for example, extension
+                               changes *__slots__*)
+        """
+        tree = mcs._check_object(obj)
+        cls = tree._get_current_class(type(obj))
+        if type(obj) is cls:
+            return False
+        obj.__class__ = cls
+        return True
+
 
 class ExtensibleByHashType(ExtensibleType):
     """ Metaclass for extensible object that allows
@@ -526,6 +2123,174 @@ class ExtensibleByHashType(ExtensibleType):
             >>> sorted(mc.get_registered_names())
             ['Addition', 'Mul']
 
+        Objects created before new extension for their key was registered
+        could be upgraded in place:
+
+            >>> class ServiceAddition3(ServiceAddition):
+            ...     def add3(self, a, b, c):
+            ...         return self.do_reduce(lambda x,y: x+y, a, b, c)
+            >>> mc.is_stale(adder)
+            True
+            >>> mc.is_stale(multiplier)
+            False
+            >>> mc.upgrade(adder)
+            True
+            >>> adder.add3(1, 2, 3)
+            6
+
+        Extensions could be disabled and enabled back at runtime:
+
+            >>> mc.disable(ServiceAddition3)
+            >>> mc.get_class('Addition')().add3(1, 2, 3)
+            Traceback (most recent call last):
+            ...
+            AttributeError: 'MyCoolClass' object has no attribute 'add3'
+            >>> mc.enable(ServiceAddition3)
+            >>> mc.get_class('Addition')().add3(1, 2, 3)
+            6
+            >>> mc.disable(ServiceBase)
+            Traceback (most recent call last):
+            ...
+            ValueError: Root class 'ServiceBase' could not be disabled
+
+        One extension may be registered for several keys (aliases),
+        using *Meta.aliases* or list as value of hash attribute.
+        Keys, that resolve to same set of base classes share
+        same generated class (as well as all unregistered keys
+        requested with ``default=True``):
+
+            >>> class ServiceSub(ServiceBase):
+            ...     class Meta:
+            ...         name = 'Sub'
+            ...         aliases = ('sub', 'Subtraction')
+            ...
+            ...     def sub(self, a, b):
+            ...         return self.do_reduce(lambda x,y: x-y, a, b)
+            >>> class ServiceDiv(ServiceBase):
+            ...     class Meta:
+            ...         name = ['Div', 'div']
+            >>> mc.get_class('sub')().sub(7, 2)
+            5
+            >>> mc.get_class('sub') is mc.get_class('Subtraction')
+            True
+            >>> mc.get_class('div') is mc.get_class('Div')
+            True
+            >>> (mc.get_class('unknown-1', default=True) is
+            ...  mc.get_class('unknown-2', default=True))
+            True
+            >>> sorted(mc.get_registered_names())
+            ['Addition', 'Div', 'Mul', 'Sub', 'Subtraction', 'div', 'sub']
+
+        If class shared by several keys was changed only for some of them,
+        it is not known which of them object of this class belongs to,
+        so such object is stale, but could not be upgraded:
+
+            >>> subtractor = mc.get_class('sub')()
+            >>> class ServiceSubNeg(ServiceSub):
+            ...     class Meta:
+            ...         name = 'sub'
+            ...     def neg(self, a):
+            ...         return -a
+            >>> mc.is_stale(subtractor)
+            True
+            >>> mc.upgrade(subtractor)  # doctest: +ELLIPSIS
+            Traceback (most recent call last):
+            ...
+            ValueError: Class 'MyCoolClass' was generated for keys ...
+
+        Extensions could be registered for ranges of versions, using
+        constraint (like ``'>=12'``) or tuple of constraints as key.
+        Versions requested by *get_class* are resolved through sorted
+        interval index, and versions matching same registered keys
+        share one cached class:
+
+            >>> vmc = ExtensibleByHashType._("Server", hashattr='version')
+            >>> @six.add_metaclass(vmc)
+            ... class ServerBase(object):
+            ...     pass
+            >>> class Server12(ServerBase):
+            ...     class Meta:
+            ...         version = ('>=12', '<15')
+            >>> class Server14(ServerBase):
+            ...     class Meta:
+            ...         version = '>=14'
+            >>> class Server14Exact(ServerBase):
+            ...     class Meta:
+            ...         version = '14.0'
+            >>> [b.__name__ for b in vmc.get_class(13).__bases__]
+            ['Server12', 'ServerBase']
+            >>> [b.__name__ for b in vmc.get_class('14.0').__bases__]
+            ['Server14Exact', 'Server14', 'Server12', 'ServerBase']
+            >>> [b.__name__ for b in vmc.get_class('15').__bases__]
+            ['Server14', 'ServerBase']
+            >>> vmc.get_class('13.1') is vmc.get_class('13.1')
+            True
+            >>> vmc.get_class(14) is vmc.get_class('14.0')
+            True
+            >>> vmc.get_class(11)
+            Traceback (most recent call last):
+            ...
+            ValueError: There is no class registered for key '11'
+
+        Exact versions match any spelling of same version (14, '14'
+        and '14.0' are same key). List of constraints is single range,
+        same as tuple (to register extension for several ranges, use
+        *Meta.aliases*):
+
+            >>> class Server10(ServerBase):
+            ...     class Meta:
+            ...         version = ['>=10', '<12']
+            >>> [b.__name__ for b in vmc.get_class('11.5').__bases__]
+            ['Server10', 'ServerBase']
+            >>> [b.__name__ for b in vmc.get_class(13).__bases__]
+            ['Server12', 'ServerBase']
+
+        So cache does not grow with number of requested versions,
+        and empty ranges are rejected at registration:
+
+            >>> classes = set(vmc.get_class('13.%d' % i) for i in range(100))
+            >>> len(classes), len(vmc._generated_class) < 10
+            (1, True)
+            >>> class ServerEmpty(ServerBase):  # doctest: +ELLIPSIS
+            ...     class Meta:
+            ...         version = ['==12', '==14']
+            Traceback (most recent call last):
+            ...
+            ValueError: Version range ['==12', '==14'] is empty: ...
+            >>> [b.__name__ for b in vmc.get_class(13).__bases__]
+            ['Server12', 'ServerBase']
+
+        Tuple of names could be used as *hashattr* to build composite
+        keys. Extensions may define only some of these attributes
+        (partial keys), and class requested for full key combines
+        all matching extensions (newest first). Each part of key
+        could be version range as well:
+
+            >>> cmc = ExtensibleByHashType._("Client",
+            ...                              hashattr=('protocol', 'version'))
+            >>> @six.add_metaclass(cmc)
+            ... class ClientBase(object):
+            ...     pass
+            >>> class ClientXMLRPC(ClientBase):
+            ...     class Meta:
+            ...         protocol = 'xml-rpc'
+            >>> class ClientV14(ClientBase):
+            ...     class Meta:
+            ...         version = '>=14'
+            >>> class ClientXMLRPC14(ClientXMLRPC):
+            ...     class Meta:
+            ...         protocol = 'xml-rpc'
+            ...         version = 14
+            >>> bases = cmc.get_class(('xml-rpc', 14)).__mro__[1:-1]
+            >>> [b.__name__ for b in bases]
+            ['ClientXMLRPC14', 'ClientV14', 'ClientXMLRPC', 'ClientBase']
+            >>> [b.__name__ for b in cmc.get_class(('json-rpc', 15)).__bases__]
+            ['ClientV14', 'ClientBase']
+            >>> cmc.get_class(('json-rpc', 13))
+            Traceback (most recent call last):
+            ...
+            ValueError: There is no class registered for key '('json-rpc', 13)'
+
         And the simple example of integration with ABC
         (or other metaclassess)::
 
@@ -571,10 +2336,315 @@ class ExtensibleByHashType(ExtensibleType):
             4
     """
     @classmethod
-    def _get_base_classes(mcs, name=None):
+    def _init_registry(mcs):
+        super(ExtensibleByHashType, mcs)._init_registry()
+        mcs._base_classes_hash = collections.defaultdict(list)
+
+        # Sets of keys generated classes were built for (one class may
+        # be shared by several keys). Used to find current class for
+        # objects created before new extensions
+        mcs._generated_keys = weakref.WeakKeyDictionary()
+
+        # Override it by dict to store diferent
+        # base generated class for each hash
+        mcs._generated_class = {}
+
+        # Keys of generated classes waiting for eager regeneration
+        mcs._outdated_keys = set()
+
+        # Objects created by get_cached_object:
+        # {(key, class, args, kwargs): (object, creation time)}
+        mcs._instance_cache = collections.OrderedDict()
+
+        # Registration order of keyed extensions: {class: number}.
+        # Used to merge extensions of exact and range keys
+        mcs._key_order = {}
+
+        # Whether *_base_classes_hash* and *_key_order* are saved by
+        # snapshot (so they have to be copied before change)
+        mcs._hash_shared = False
+
+        # Interval index of range and version keys (built on demand)
+        mcs._range_index = None
+
+        # Whether there are registered keys, that may match other keys
+        # (see _is_pattern_key). None if not computed yet
+        mcs._pattern_keys = None
+
+        # Keys used to cache classes for requested keys matched by
+        # patterns: {registered keys matching key: first requested key},
+        # so all spellings of same version (or all versions in same
+        # range) share one cache entry
+        mcs._resolved_keys = {}
+
+    @classmethod
+    def _get_registry_state(mcs):
+        """ Returns dict with registry containers of this tree.
+            Keyed containers are changed in place on registration,
+            so they are marked as shared, to be copied before
+            next change (see *_add_base_class*)
+        """
+        state = super(ExtensibleByHashType, mcs)._get_registry_state()
+        with mcs._lock:
+            state.update(_base_classes_hash=mcs._base_classes_hash,
+                         _key_order=mcs._key_order)
+            mcs._hash_shared = True
+        return state
+
+    @classmethod
+    def _set_registry_state(mcs, state):
+        mcs._range_index = None
+        mcs._pattern_keys = None
+        with mcs._lock:
+            # Containers still belong to snapshot, that may be restored
+            # again, so they must not be changed in place
+            mcs._hash_shared = True
+        super(ExtensibleByHashType, mcs)._set_registry_state(state)
+
+    @classmethod
+    def _split_key(mcs, key):
+        """ Returns tuple of parts of *key* (one part per hash attribute),
+            or None if *key* does not match composite hash attribute
+        """
+        if not isinstance(mcs._hashattr, tuple):
+            return (key,)
+        if isinstance(key, tuple) and len(key) == len(mcs._hashattr):
+            return key
+        return None
+
+    @classmethod
+    def _is_pattern_key(mcs, key):
+        """ Checks if *key* may match other keys: it is version range
+            or version (that matches other spellings of same version,
+            like 14 and '14.0'), or composite key with some parts
+            being None, ranges or versions
+        """
+        parts = mcs._split_key(key)
+        if parts is None:
+            return False
+        return any((p is None and len(parts) > 1) or
+                   _parse_version_range(p) is not None or
+                   _parse_version(p) is not None for p in parts)
+
+    @classmethod
+    def _has_pattern_keys(mcs):
+        """ Checks if there are extensions registered for keys, that
+            may match other keys (see :meth:`_is_pattern_key`).
+            If there are no such keys, only exact keys have to be
+            looked up, without range index and partial keys.
+        """
+        if mcs._pattern_keys is None:
+            mcs._pattern_keys = any(
+                classes and mcs._is_pattern_key(key)
+                for key, classes in list(mcs._base_classes_hash.items()))
+        return mcs._pattern_keys
+
+    @classmethod
+    def _get_range_index(mcs, dim=0):
+        """ Returns interval index of version ranges and exact versions
+            used in part *dim* of registered keys, or None if there are
+            no such keys
+        """
+        if mcs._range_index is None:
+            mcs._range_index = {}
+        index = mcs._range_index.get(dim, None)
+        if index is None:
+            ranges = {}
+            for key, classes in list(mcs._base_classes_hash.items()):
+                parts = mcs._split_key(key)
+                if not classes or parts is None:
+                    continue
+                rng = _parse_version_range(parts[dim])
+                if rng is None:
+                    version = _parse_version(parts[dim])
+                    if version is not None:
+                        rng = (version, True, version, True)
+                if rng is not None:
+                    ranges[parts[dim]] = rng
+            index = mcs._range_index[dim] = (
+                _RangeIndex([(rng, [part])
+                             for part, rng in ranges.items()])
+                if ranges else False)
+        return index or None
+
+    @classmethod
+    def _get_matching_keys(mcs, name):
+        """ Returns list of keys, extensions of which have to be used
+            for requested key *name*: key itself, ranges containing
+            version *name* and, for composite keys, all partial keys
+            (with None instead of some parts) matching *name*
+        """
+        if not mcs._has_pattern_keys():
+            return [name]
+        parts = mcs._split_key(name)
+        if parts is None:
+            return [name]
+        options = []
+        for dim, part in enumerate(parts):
+            values = [part]
+            index = mcs._get_range_index(dim)
+            version = _parse_version(part) if index is not None else None
+            if version is not None:
+                values.extend(v for v in index.lookup(version) if v != part)
+            if part is not None and len(parts) > 1:
+                values.append(None)
+            options.append(values)
+        if len(options) == 1:
+            return options[0]
+        return list(itertools.product(*options))
+
+    @classmethod
+    def _get_keyed_classes(mcs, name):
+        """ Returns extensions registered for keys matching *name*
+            (see :meth:`_get_matching_keys`), newest first
+        """
+        found = [mcs._base_classes_hash[k]
+                 for k in mcs._get_matching_keys(name)
+                 if mcs._base_classes_hash.get(k)]
+        if not found:
+            return []
+        if len(found) == 1:
+            return found[0]
+        return sorted(set().union(*found),
+                      key=mcs._key_order.get, reverse=True)
+
+    @classmethod
+    def _get_own_base_classes(mcs, name=None):
         if name is None:
             return mcs._base_classes
-        return mcs._base_classes_hash[name] + mcs._base_classes
+        return mcs._get_keyed_classes(name) + mcs._base_classes
+
+    @classmethod
+    def _is_known_key(mcs, name):
+        """ Checks if there are extensions registered for key *name*
+            (in this tree or in parent tree)
+        """
+        if name in mcs._base_classes_hash:
+            return True
+        if mcs._has_pattern_keys() and mcs._get_keyed_classes(name):
+            return True
+        return mcs._parent is not None and mcs._parent._is_known_key(name)
+
+    @classmethod
+    def _get_class_keys(mcs, cls):
+        """ Returns list of keys *cls* have to be registered for.
+            First key is main key, others are aliases (defined by
+            *Meta.aliases* or by list as value of hash attribute).
+        """
+        meta = getattr(cls, 'Meta', None)
+        if isinstance(mcs._hashattr, tuple):
+            parts = [getattr(meta, attr, None) for attr in mcs._hashattr]
+            if all(p is None for p in parts):
+                return []
+            keys = list(itertools.product(*[
+                _get_value_keys(p) for p in parts]))
+        else:
+            _hash = getattr(meta, mcs._hashattr, None)
+            if _hash is None:
+                return []
+            keys = _get_value_keys(_hash)
+        for alias in getattr(meta, 'aliases', ()):
+            if alias not in keys:
+                keys.append(alias)
+        for key in keys:
+            # Empty version ranges are rejected before class is registered
+            for part in mcs._split_key(key) or ():
+                _parse_version_range(part)
+        return keys
+
+    @classmethod
+    def _get_class_hash(mcs, cls):
+        keys = mcs._get_class_keys(cls)
+        return keys[0] if keys else None
+
+    @classmethod
+    def _is_registered(mcs, cls):
+        return cls in mcs._get_base_classes(mcs._get_class_hash(cls))
+
+    @classmethod
+    def _get_extensions(mcs):
+        """ Returns list of all classes registered in this tree
+        """
+        res = list(mcs._base_classes)
+        for classes in list(mcs._base_classes_hash.values()):
+            res.extend(c for c in classes if c not in res)
+        if mcs._parent is not None:
+            res.extend(mcs._parent._get_extensions())
+        return res
+
+    @classmethod
+    def _invalidate(mcs, name=None):
+        """ Cleans cache of generated classes for key *name*
+            or all caches if *name* is None
+        """
+        if name is None:
+            mcs._profile_classes = collections.OrderedDict()
+            mcs._resolved_keys = {}
+            mcs._root = None
+        else:
+            with mcs._lock:
+                for key in [k for k in mcs._profile_classes
+                            if k[1] == name]:
+                    del mcs._profile_classes[key]
+                # Other keys resolved to same class as *name* may
+                # resolve to different class now
+                for sig in [s for s, k in mcs._resolved_keys.items()
+                            if k == name]:
+                    del mcs._resolved_keys[sig]
+        mcs._abc_checks_token = None
+        mcs._epoch += 1
+        mcs.clear_cached_objects(name)
+        for child in list(mcs._children):
+            child._invalidate(name)
+
+        if mcs._regenerate == 'lazy':
+            if name is None:
+                mcs._generated_class = {}
+            else:
+                mcs._generated_class[name] = None
+            return
+
+        with mcs._lock:
+            if name is None:
+                outdated = [k for k, v in mcs._generated_class.items()
+                            if v is not None]
+            elif mcs._generated_class.get(name, None) is not None:
+                outdated = [name]
+            else:
+                outdated = []
+            mcs._outdated_keys.update(outdated)
+        if mcs._outdated_keys:
+            mcs._schedule_regeneration()
+
+    @classmethod
+    def _regenerate_classes(mcs):
+        """ Builds new classes instead of outdated ones, and replaces
+            them, if tree was not changed while classes were built.
+        """
+        epoch = mcs._epoch
+        keys = set(mcs._outdated_keys)
+        # Keys may be not registered anymore (for example, after
+        # restore of snapshot), classes of such keys are just dropped
+        classes = dict(
+            (key, mcs._build_class(mcs._get_active_bases(key)))
+            for key in keys if key is None or mcs._is_known_key(key))
+        with mcs._lock:
+            if epoch != mcs._epoch:
+                return
+            generated = dict(mcs._generated_class)
+            generated.update(classes)
+            for key in keys.difference(classes):
+                generated.pop(key, None)
+            mcs._generated_class = generated
+            mcs._outdated_keys.difference_update(keys)
+            for key, cls in classes.items():
+                mcs._generated_keys.setdefault(cls, set()).add(key)
+
+    @classmethod
+    def _drop_outdated_classes(mcs):
+        for key in mcs._outdated_keys:
+            mcs._generated_class[key] = None
+        mcs._outdated_keys.clear()
 
     @classmethod
     def _add_base_class(mcs, cls):
@@ -582,17 +2652,46 @@ class ExtensibleByHashType(ExtensibleType):
         """
         # Do all magic only if subclass had defined required attributes
         if getattr(mcs, '_base_classes_hash', None) is not None:
-            meta = getattr(cls, 'Meta', None)
-            _hash = getattr(meta, mcs._hashattr, None)
-            if _hash is None and cls not in mcs._get_base_classes():
-                mcs._base_classes.insert(0, cls)
-                mcs._generated_class = {}  # Cleanup all caches
-            elif _hash is not None and cls not in mcs._get_base_classes(_hash):
-                mcs._base_classes_hash[_hash].insert(0, cls)
-                mcs._generated_class[_hash] = None
+            keys = mcs._get_class_keys(cls)
+            if keys:
+                keys = [k for k in keys
+                        if cls not in mcs._base_classes_hash.get(k, ())]
+                if not keys:
+                    return
+                with mcs._lock:
+                    if mcs._hash_shared:
+                        # Containers are saved by snapshot, so they are
+                        # copied once, and copies are changed in place
+                        # until next snapshot
+                        mcs._key_order = dict(mcs._key_order)
+                        mcs._base_classes_hash = collections.defaultdict(
+                            list, mcs._base_classes_hash)
+                        mcs._hash_shared = False
+                    mcs._key_order[cls] = len(mcs._key_order)
+                    for _hash in keys:
+                        # Lists of classes are replaced, not changed
+                        # in place, so they are shared with snapshots
+                        mcs._base_classes_hash[_hash] = (
+                            [cls] + mcs._base_classes_hash.get(_hash, []))
+                for _hash in keys:
+                    if mcs._is_pattern_key(_hash):
+                        # Classes of all keys matching pattern are outdated
+                        mcs._range_index = None
+                        mcs._pattern_keys = True
+                        mcs._invalidate()
+                    else:
+                        mcs._invalidate(_hash)
+            elif cls not in mcs._get_base_classes():
+                mcs._base_classes = [cls] + mcs._base_classes
+                mcs._invalidate()  # Cleanup all caches
+            else:
+                return
+            if mcs._profiler is not None:
+                mcs._profiler._instrument(cls)
 
     @classmethod
-    def _(mcs, cls_name='Object', with_meta=None, hashattr='_name'):
+    def _(mcs, cls_name='Object', with_meta=None, hashattr='_name',
+          cache_size=_CLASS_CACHE_SIZE, incremental=False, regenerate='lazy'):
         """ Method to generate real metaclass to be used
             ::
 
@@ -607,22 +2706,106 @@ class ExtensibleByHashType(ExtensibleType):
             :param str cls_name: name of generated class
             :param class with_meta: Mix aditional metaclass in.
                                     (default: None)
-            :param hashattr: name of class Meta attribute to be used as hash.
+            :param hashattr: name of class Meta attribute to be used as hash,
+                             or tuple of names to use composite keys.
                              default='_name'
+            :param int cache_size: number of recently generated classes
+                                   to keep for reuse. None means no limit.
+                                   (default: 128)
+            :param bool incremental: compose classes incrementally.
+                                     See :meth:`ExtensibleType._`
+                                     (default: False)
+            :param str regenerate: policy of regeneration of classes
+                                   ('lazy', 'sync' or 'background').
+                                   See :meth:`ExtensibleType._`
+                                   (default: 'lazy')
             :return: specific metaclass to track new inheritance tree
-        """
-        extype = super(ExtensibleByHashType, mcs)._(cls_name=cls_name,
-                                                    with_meta=with_meta)
-
-        class EXHType(extype):
-            _hashattr = hashattr
-            _base_classes_hash = collections.defaultdict(list)
-
-            # Override it by dict to store diferent
-            # base generated class for each hash
-            _generated_class = {}
 
-        return EXHType
+            With eager regeneration, classes generated for each key are
+            rebuilt right after extension for this key is registered,
+            or after snapshot is restored (classes of keys registered
+            after snapshot are dropped)::
+
+                >>> mc = ExtensibleByHashType._("SyncObject",
+                ...                             hashattr='name',
+                ...                             regenerate='sync')
+                >>> @six.add_metaclass(mc)
+                ... class SyncObject(object):
+                ...     pass
+                >>> class SyncA(SyncObject):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> cls1 = mc.get_class('a')
+                >>> snap = mc.snapshot()
+                >>> class SyncA2(SyncObject):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> class SyncB(SyncObject):
+                ...     class Meta:
+                ...         name = 'b'
+                >>> SyncA2 in mc._generated_class['a'].__bases__
+                True
+                >>> mc.get_class('b').__bases__ == (SyncB, SyncObject)
+                True
+                >>> mc.restore(snap)
+                >>> sorted(mc._generated_class)
+                ['a']
+                >>> mc.get_class('a') is cls1
+                True
+
+            If class could not be built (for example, because of
+            MRO conflict), it is dropped, and error is raised
+            on next request of class, same as for 'lazy' policy::
+
+                >>> class Mixin(object):
+                ...     pass
+                >>> class SyncM1(SyncObject, Mixin):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> class SyncM2(Mixin, SyncObject):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> mc._generated_class['a'] is None
+                True
+                >>> mc.get_class('a')  # doctest: +ELLIPSIS
+                Traceback (most recent call last):
+                ...
+                TypeError: ...
+
+            Same for regeneration in background thread::
+
+                >>> mc = ExtensibleByHashType._("BgHObject",
+                ...                             hashattr='name',
+                ...                             regenerate='background')
+                >>> @six.add_metaclass(mc)
+                ... class BgHObject(object):
+                ...     pass
+                >>> class BgHA(BgHObject):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> cls1 = mc.get_class('a')
+                >>> snap = mc.snapshot()
+                >>> class BgHA2(BgHObject):
+                ...     class Meta:
+                ...         name = 'a'
+                >>> class BgHB(BgHObject):
+                ...     class Meta:
+                ...         name = 'b'
+                >>> cls_b = mc.get_class('b')
+                >>> mc.wait_regeneration()
+                True
+                >>> BgHA2 in mc._generated_class['a'].__bases__
+                True
+                >>> mc.restore(snap)
+                >>> mc.wait_regeneration()
+                True
+                >>> sorted(mc._generated_class)
+                ['a']
+                >>> mc.get_class('a') is cls1
+                True
+        """
+        return mcs._new_tree('EXHType', cls_name, with_meta, cache_size,
+                             incremental, regenerate, _hashattr=hashattr)
 
     @classmethod
     def get_class(mcs, name, default=False):
@@ -648,21 +2831,89 @@ class ExtensibleByHashType(ExtensibleType):
                 # get specific class
                 MyX1 = mc.get_class('X1')
 
+            If some profile is activated in current context
+            (see :meth:`ExtensibleType.activate`), then class generated for
+            this profile will be returned.
+
+            Version (int or string like '13.1') *name* also matches
+            extensions registered for version ranges containing it.
+            For composite keys, *name* is tuple of values of all hash
+            attributes, and matches extensions registered for partial
+            keys too (see :class:`ExtensibleByHashType`).
+
             :param name: key to get class for
             :param bool default: if set to True will generate default class for
                                  if there no special class defined for such key
             :return: generated class for requested type
         """
-        if default is False and name not in mcs._base_classes_hash:
-            raise ValueError(
-                "There is no class registered for key '%s'" % name)
-        if mcs._generated_class.get(name, None) is None:
-            cls = type(
-                mcs._cls_name,
-                tuple(mcs._get_base_classes(name)),
-                {'_generated': True})
-            mcs._generated_class[name] = cls
-        return mcs._generated_class[name]
+        profile = mcs._active_profile.get()
+
+        # Only registered keys are cached, so no need to resolve them
+        if name is not None:
+            cls = mcs._get_cached_class(name, profile)
+            if cls is not None:
+                return cls
+
+        name = mcs._resolve_key(name, default=default)
+        cls = mcs._get_cached_class(name, profile)
+        if cls is None:
+            cls = mcs._build_class(mcs._get_active_bases(name, profile))
+            if profile is None:
+                mcs._generated_class[name] = cls
+            else:
+                mcs._lru_put(mcs._profile_classes, (profile, name), cls)
+            mcs._generated_keys.setdefault(cls, set()).add(name)
+        return cls
+
+    @classmethod
+    def _resolve_key(mcs, name, default=False):
+        """ Returns key class requested for key *name* have to be
+            generated for: *name* itself, or None (key of default class)
+            if there are no extensions registered for *name*
+            and *default* is True
+
+            :raises ValueError: if there are no extensions registered
+                                for *name* and *default* is False
+        """
+        if not mcs._is_known_key(name):
+            if default is False:
+                raise ValueError(
+                    "There is no class registered for key '%s'" % (name,))
+            # All unregistered keys share same default class
+            return None
+
+        tree = mcs
+        while tree is not None and not tree._has_pattern_keys():
+            tree = tree._parent
+        if tree is None:
+            # Only exact keys are registered
+            return name
+        # Keys resolved to same set of registered keys share same class,
+        # so cache of classes does not grow with number of requested
+        # spellings of versions (that usually come from external servers)
+        return mcs._resolved_keys.setdefault(
+            mcs._get_key_signature(name), name)
+
+    @classmethod
+    def _get_key_signature(mcs, name):
+        """ Returns registered keys matching *name* in this tree and
+            in parent trees, that define set of extensions of class
+            generated for *name*
+        """
+        keys = tuple(k for k in mcs._get_matching_keys(name)
+                     if mcs._base_classes_hash.get(k))
+        if mcs._parent is not None:
+            return keys, mcs._parent._get_key_signature(name)
+        return keys
+
+    @classmethod
+    def _get_cached_class(mcs, name, profile):
+        """ Returns class generated for key *name* and *profile*,
+            or None if it was not generated yet
+        """
+        if profile is None:
+            return mcs._generated_class.get(name, None)
+        return mcs._lru_get(mcs._profile_classes, (profile, name))
 
     @classmethod
     def get_object(mcs, *args, **kwargs):
@@ -671,12 +2922,140 @@ class ExtensibleByHashType(ExtensibleType):
         raise NotImplementedError(
             "this method is not implemented for ExtensibleByHashType class")
 
+    @classmethod
+    def _get_instance_cache_policy(mcs):
+        """ Returns (maxsize, ttl) for instance cache, configured by
+            *Meta.instance_cache* of root class, or None if
+            instance caching is not enabled.
+        """
+        root = mcs._get_root()
+        policy = getattr(getattr(root, 'Meta', None), 'instance_cache', None)
+        if not policy:
+            return None
+        if policy is True:
+            policy = {}
+        return (policy.get('maxsize', _INSTANCE_CACHE_SIZE),
+                policy.get('ttl', None))
+
+    @classmethod
+    def get_cached_object(mcs, name, *args, **kwargs):
+        """ Returns object of class generated for key *name*, created
+            with specified arguments. If instance caching is enabled
+            by *Meta.instance_cache* of root class, objects are
+            cached by key and arguments, so expensive objects are
+            not created each time. Otherwise new object is created
+            on each call.
+
+            *Meta.instance_cache* could be set to True, or to dict
+            with following optional items:
+
+                - maxsize: max number of cached objects. Least recently
+                           used objects are removed first (default: 128)
+                - ttl: time in seconds, cached object is valid for
+                       (default: no limit)
+
+            Cached objects are dropped, when class for their key
+            is regenerated (for example, because new extension registered)::
+
+                >>> mc = ExtensibleByHashType._("CachedConn", hashattr='name')
+                >>> @six.add_metaclass(mc)
+                ... class CachedConnBase(object):
+                ...     class Meta:
+                ...         instance_cache = {'maxsize': 16, 'ttl': 3600}
+                ...     def __init__(self, host, port):
+                ...         self.host, self.port = host, port
+                >>> class CachedConnXMLRPC(CachedConnBase):
+                ...     class Meta:
+                ...         name = 'xml-rpc'
+                >>> conn = mc.get_cached_object('xml-rpc', 'localhost', 8069)
+                >>> conn is mc.get_cached_object('xml-rpc', 'localhost', 8069)
+                True
+                >>> conn is mc.get_cached_object('xml-rpc', 'localhost', 8070)
+                False
+                >>> class CachedConnXMLRPC2(CachedConnXMLRPC):
+                ...     pass
+                >>> conn is mc.get_cached_object('xml-rpc', 'localhost', 8069)
+                False
+
+            All arguments must be hashable.
+
+            :param name: key to get class for
+            :return: object of class generated for *name*
+            :raises ValueError: if there is no class registered for *name*
+        """
+        cls = mcs.get_class(name)
+        policy = mcs._get_instance_cache_policy()
+        if policy is None:
+            return cls(*args, **kwargs)
+        maxsize, ttl = policy
+
+        cache_key = (name, cls, args, tuple(sorted(kwargs.items())))
+        with mcs._lock:
+            cached = mcs._instance_cache.pop(cache_key, None)
+            if cached is not None and (
+                    ttl is None or _monotonic() - cached[1] <= ttl):
+                mcs._instance_cache[cache_key] = cached
+                return cached[0]
+
+        obj = cls(*args, **kwargs)
+        with mcs._lock:
+            mcs._instance_cache[cache_key] = (obj, _monotonic())
+            while len(mcs._instance_cache) > maxsize:
+                mcs._instance_cache.popitem(last=False)
+        return obj
+
+    @classmethod
+    def clear_cached_objects(mcs, name=None):
+        """ Drops objects cached by :meth:`get_cached_object`
+            for key *name* or all objects if *name* is None
+        """
+        with mcs._lock:
+            if name is None:
+                mcs._instance_cache.clear()
+                return
+            for cache_key in list(mcs._instance_cache):
+                if cache_key[0] == name:
+                    del mcs._instance_cache[cache_key]
+
+    @classmethod
+    def _get_current_class(mcs, cls):
+        """ Returns class, that have to be used now instead of *cls*
+
+            Key is taken from the keys *cls* was generated for, or,
+            if *cls* is not generated class, from its *Meta*.
+
+            :raises ValueError: if *cls* was generated for several keys,
+                                that resolve to different classes now
+        """
+        classes = mcs._get_current_classes(cls)
+        if len(classes) > 1:
+            keys = mcs._generated_keys.get(cls, ())
+            raise ValueError(
+                "Class '%s' was generated for keys %s, that resolve to "
+                "different classes now, so current class is ambiguous" % (
+                    cls.__name__, ', '.join(sorted(repr(k) for k in keys))))
+        return classes.pop()
+
+    @classmethod
+    def _get_current_classes(mcs, cls):
+        """ Returns set of current classes for keys *cls* was generated
+            for (see :meth:`_get_current_class`)
+        """
+        keys = mcs._generated_keys.get(cls, None)
+        if not keys:
+            keys = [mcs._get_class_hash(cls)]
+        return set(mcs.get_class(name, default=True) for name in keys)
+
     @classmethod
     def get_registered_names(mcs):
         """ Return's list of names (keys) registered in this tree.
             For each name specific classes exists
         """
-        return [k for k, v in six.iteritems(mcs._base_classes_hash) if v]
+        names = [k for k, v in list(mcs._base_classes_hash.items()) if v]
+        if mcs._parent is not None:
+            names.extend(k for k in mcs._parent.get_registered_names()
+                         if k not in names)
+        return names
 
 
 class TMeta(ExtensibleType):
@@ -746,12 +3125,16 @@ class TMeta(ExtensibleType):
             return super(TMeta, mcs).__new__(mcs, name, bases, attrs)
 
         with_meta = getattr(extensible_meta, 'with_meta', None)
+        cache_size = getattr(extensible_meta, 'cache_size', _CLASS_CACHE_SIZE)
+        incremental = getattr(extensible_meta, 'incremental', False)
+        regenerate = getattr(extensible_meta, 'regenerate', 'lazy')
         # If we create class that is subclass of 'Extensible' or\
         # other root class do all the magi:
         #  - Generate metaclass for class to be created
         #  - Add attribute that means "not futher extension magic required"
         #    (_extensible_meta_done)
-        mc = mcs._(name, with_meta=with_meta)
+        mc = mcs._(name, with_meta=with_meta, cache_size=cache_size,
+                   incremental=incremental, regenerate=regenerate)
         mc._extensible_meta_done = True
         if six.PY2:
             # set newly generated metaclass for this object
@@ -846,6 +3229,19 @@ class Extensible(object):
             ...
             AttributeError: 'MyClass' object has no attribute 'my_method_2'
 
+        unless they are upgraded explicitly:
+
+            >>> is_stale(my_obj)
+            True
+            >>> upgrade(my_obj)
+            True
+            >>> my_obj.my_attr
+            25
+            >>> my_obj.my_method_2()
+            Method 2
+            >>> is_stale(my_obj)
+            False
+
         Test that initialization of new objects performed only once
         (such bug was present in versions <= 1.1.0)
 
@@ -875,6 +3271,580 @@ class Extensible(object):
         return gcls.__new__(gcls, *args, **kwargs)
 
 
-if __name__ == '__main__':
+class class_cached(object):
+    """ Decorator for class-level computations, that have to be done
+        once per generated class (for example, merging of some data
+        defined by all extensions of class).
+
+        Decorated function receives class as single argument.
+        Result is computed on first access and stored in generated
+        class, so it will be dropped automatically, when class is
+        regenerated (for example, when new extension is registered)::
+
+            >>> class CachedBase(Extensible):
+            ...     fields = {'name': str}
+            ...
+            ...     @class_cached
+            ...     def all_fields(cls):
+            ...         print("Computing fields for %s" % cls.__name__)
+            ...         res = {}
+            ...         for klass in reversed(cls.__mro__):
+            ...             res.update(klass.__dict__.get('fields', {}))
+            ...         return res
+            >>> class CachedExt(CachedBase):
+            ...     fields = {'age': int}
+            >>> obj = CachedBase()
+            >>> sorted(obj.all_fields)
+            Computing fields for CachedBase
+            ['age', 'name']
+            >>> sorted(CachedBase().all_fields)
+            ['age', 'name']
+            >>> class CachedExt2(CachedBase):
+            ...     fields = {'email': str}
+            >>> sorted(CachedBase().all_fields)
+            Computing fields for CachedBase
+            ['age', 'email', 'name']
+
+        When accessed on class that is not generated class
+        (for example, directly on extension), value is computed
+        on each access and not cached.
+    """
+    def __init__(self, func):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __get__(self, obj, cls=None):
+        if cls is None:
+            cls = type(obj)
+        values = cls.__dict__.get('_class_cached_values', None)
+        if values is None:
+            return self.func(cls)
+        try:
+            return values[self]
+        except KeyError:
+            value = values[self] = self.func(cls)
+            return value
+
+
+class ExtensionProfiler(object):
+    """ Collects per-extension statistics of method calls of extension
+        tree. Usually created by :meth:`ExtensibleType.profile`.
+
+        While profiler is active (inside ``with`` block), all functions,
+        static and class methods and accessors of properties defined in
+        extensions of tree are replaced by wrappers, that measure wall
+        time and, if *memory* is True, memory allocated (with
+        *tracemalloc*) during call.
+        Time and memory spent in nested calls of other instrumented
+        methods (for example via *super*) are attributed to those methods,
+        so each extension gets only its own (self) cost.
+
+        :param mcs: metaclass of extension tree to profile
+        :param bool memory: trace memory allocations
+    """
+    def __init__(self, mcs, memory=False):
+        self._mcs = mcs
+        self._memory = memory
+        self._stop_tracemalloc = False
+        self._originals = []
+        self._stats = collections.OrderedDict()
+        self._stacks = collections.defaultdict(int)
+        self._local = threading.local()
+
+    def __enter__(self):
+        if self._mcs._profiler is not None:
+            raise RuntimeError(
+                "Extension tree '%s' is already profiled" % (
+                    self._mcs._cls_name))
+        if self._memory:
+            if tracemalloc is None:
+                raise RuntimeError(
+                    "Memory profiling requires tracemalloc module")
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._stop_tracemalloc = True
+        self._mcs._profiler = self
+        for ext in self._mcs._get_extensions():
+            self._instrument(ext)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._mcs._profiler = None
+        while self._originals:
+            ext, name, value = self._originals.pop()
+            setattr(ext, name, value)
+        if self._stop_tracemalloc:
+            tracemalloc.stop()
+            self._stop_tracemalloc = False
+
+    def _instrument(self, ext):
+        """ Replaces methods defined in *ext* with instrumented wrappers
+        """
+        for name, value in list(vars(ext).items()):
+            if isinstance(value, (staticmethod, classmethod)):
+                wrapped = type(value)(
+                    self._wrap(ext, name, value.__func__))
+            elif isinstance(value, property):
+                wrapped = type(value)(*[
+                    self._wrap(ext, name + suffix, func)
+                    if func is not None else None
+                    for func, suffix in ((value.fget, ''),
+                                         (value.fset, '.setter'),
+                                         (value.fdel, '.deleter'))
+                ] + [value.__doc__])
+            elif callable(value) and hasattr(value, '__code__'):
+                wrapped = self._wrap(ext, name, value)
+            else:
+                continue
+            self._originals.append((ext, name, value))
+            setattr(ext, name, wrapped)
+
+    def _get_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _wrap(self, ext, name, func):
+        frame = '%s.%s.%s' % (ext.__module__, _qualname(ext), name)
+        stats = self._stats.get(ext, None)
+        if stats is None:
+            stats = self._stats[ext] = {
+                'extension': '%s.%s' % (ext.__module__, _qualname(ext)),
+                'calls': 0,
+                'time': 0.0,
+                'self_time': 0.0,
+                'memory': 0,
+            }
+        memory = self._memory
+        timer = timeit.default_timer
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._get_stack()
+            # Frame: [name, time of nested calls, memory of nested calls]
+            entry = [frame, 0.0, 0]
+            stack.append(entry)
+            start_mem = tracemalloc.get_traced_memory()[0] if memory else 0
+            start = timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = timer() - start
+                used = (tracemalloc.get_traced_memory()[0] - start_mem
+                        if memory else 0)
+                self_time = elapsed - entry[1]
+                stats['calls'] += 1
+                stats['time'] += elapsed
+                stats['self_time'] += self_time
+                stats['memory'] += used - entry[2]
+                self._stacks[';'.join(e[0] for e in stack)] += int(
+                    self_time * 1e6)
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                    stack[-1][2] += used
+        return wrapper
+
+    def get_stats(self):
+        """ Returns list of statistics for each instrumented extension.
+            Each item is dictionary with following keys:
+
+                - extension: full name of extension class
+                - calls: number of calls of extension's methods
+                - time: total wall time (seconds) of these calls
+                - self_time: wall time (seconds) without time
+                             of nested calls of other extensions' methods
+                - memory: net size (bytes) of memory allocated
+                          by extension's methods and not released
+                          on return (if memory tracing enabled)
+        """
+        return [dict(s) for s in self._stats.values() if s['calls']]
+
+    def dump_folded(self, stream):
+        """ Writes collected call stacks to *stream* in folded format
+            (``frame1;frame2;frame3 value``), that is accepted by
+            flame graph tools (for example *flamegraph.pl* or
+            *speedscope*). Values are self time in microseconds::
+
+                >>> mc = ExtensibleType._("Folded")
+                >>> @six.add_metaclass(mc)
+                ... class Folded(object):
+                ...     def get_value(self):
+                ...         return 1
+                ...     @property
+                ...     def value(self):
+                ...         return self.get_value()
+                >>> class FoldedExt(Folded):
+                ...     def get_value(self):
+                ...         return super(FoldedExt, self).get_value() + 1
+                >>> with mc.profile() as profiler:
+                ...     mc.get_object().value
+                2
+                >>> stream = six.StringIO()
+                >>> profiler.dump_folded(stream)
+                >>> for line in stream.getvalue().splitlines():
+                ...     stack, value = line.rsplit(' ', 1)
+                ...     print(';'.join(f.split('.', 1)[1]
+                ...                    for f in stack.split(';')))
+                Folded.value
+                Folded.value;FoldedExt.get_value
+                Folded.value;FoldedExt.get_value;Folded.get_value
+                >>> type(Folded.__dict__['value']) is property
+                True
+
+            :param stream: file-like object opened in text mode
+        """
+        for stack, value in sorted(self._stacks.items()):
+            stream.write('%s %d\n' % (stack, value))
+
+
+def _find_object_tree(obj):
+    """ Returns extension tree (metaclass), that created object *obj*,
+        or None if *obj* was not created by extension tree.
+
+        Generated classes keep tree, that generated them, as their
+        metaclass may be metaclass of parent tree
+    """
+    cls = type(obj)
+    mcs = cls.__dict__.get('_extension_tree', None) or type(cls)
+    return mcs if issubclass(mcs, ExtensibleType) else None
+
+
+def _get_object_tree(obj):
+    mcs = _find_object_tree(obj)
+    if mcs is None:
+        raise ValueError(
+            "Object %r does not belong to any extension tree" % obj)
+    return mcs
+
+
+def is_stale(obj):
+    """ Checks if object *obj* (created by any extension tree)
+        was created before some of extensions were registered.
+
+        Shortcut for *is_stale* method of extension tree, that created
+        *obj*.
+        See :meth:`ExtensibleType.is_stale`
+    """
+    return _get_object_tree(obj).is_stale(obj)
+
+
+def upgrade(obj):
+    """ Moves object *obj* (created by any extension tree)
+        to current generated class in place.
+
+        Shortcut for *upgrade* method of extension tree, that created
+        *obj*.
+        See :meth:`ExtensibleType.upgrade`
+    """
+    return _get_object_tree(obj).upgrade(obj)
+
+
+def snapshot():
+    """ Saves state of all extension trees created by this module.
+        Trees created after snapshot was taken are not affected
+        by restore::
+
+            >>> mc1 = ExtensibleType._("GlobalSnapshot1")
+            >>> @six.add_metaclass(mc1)
+            ... class GlobalSnapshot1(object):
+            ...     pass
+            >>> mc2 = ExtensibleByHashType._("GlobalSnapshot2",
+            ...                              hashattr='name')
+            >>> @six.add_metaclass(mc2)
+            ... class GlobalSnapshot2(object):
+            ...     pass
+            >>> snap = snapshot()
+            >>> class GlobalSnapshot1Ext(GlobalSnapshot1):
+            ...     pass
+            >>> class GlobalSnapshot2Ext(GlobalSnapshot2):
+            ...     class Meta:
+            ...         name = 'ext'
+            >>> mc3 = ExtensibleType._("GlobalSnapshot3")
+            >>> @six.add_metaclass(mc3)
+            ... class GlobalSnapshot3(object):
+            ...     pass
+            >>> class GlobalSnapshot3Ext(GlobalSnapshot3):
+            ...     pass
+            >>> restore(snap)
+            >>> mc1.get_class().__bases__ == (GlobalSnapshot1,)
+            True
+            >>> mc2.get_registered_names()
+            []
+            >>> GlobalSnapshot3Ext in mc3.get_class().__bases__
+            True
+
+        See :meth:`ExtensibleType.snapshot`
+
+        :return: snapshot object
+    """
+    return _RegistrySnapshot(dict(
+        (tree, tree._get_registry_state()) for tree in list(_trees)))
+
+
+def restore(snapshot):
+    """ Restores state of all extension trees saved by :func:`snapshot`
+        (or by :meth:`ExtensibleType.snapshot`)
+    """
+    snapshot.restore()
+
+
+class _ImportTimer(object):
+    """ Context manager, that measures time spent on execution of each
+        module imported inside ``with`` block (like ``-X importtime``).
+
+        On Python 3.4+ it is installed as meta path finder, that wraps
+        loaders of found modules. On older versions only calls
+        wrapped by :meth:`load` are measured.
+    """
+    def __init__(self):
+        self.times = collections.OrderedDict()  # name: [self, cumulative]
+        self._stack = []
+        self._hooked = sys.version_info >= (3, 4)
+
+    def __enter__(self):
+        if self._hooked:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._hooked:
+            sys.meta_path.remove(self)
+
+    def _measure(self, name, func, *args, **kwargs):
+        self._stack.append(0.0)
+        start = timeit.default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = timeit.default_timer() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            times = self.times.setdefault(name, [0.0, 0.0])
+            times[0] += elapsed - nested
+            times[1] += elapsed
+
+    def load(self, name, func, *args, **kwargs):
+        """ Calls *func*, that imports module *name*
+        """
+        if self._hooked:
+            return func(*args, **kwargs)
+        return self._measure(name, func, *args, **kwargs)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, 'find_spec', None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        # Some loaders (builtin, frozen) are classes, that are
+        # shared by many modules, so they are not wrapped.
+        if isinstance(loader, type) or \
+                not hasattr(loader, 'exec_module'):
+            return spec
+
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            del loader.exec_module
+            return self._measure(fullname, exec_module, module)
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+
+def _iter_entry_points(group):
+    try:
+        from importlib import metadata
+    except ImportError:  # Python < 3.8
+        metadata = None
+    if metadata is not None:
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, 'select'):
+            return list(entry_points.select(group=group))
+        return list(entry_points.get(group, []))
+    try:
+        import pkg_resources
+    except ImportError:
+        return []
+    return list(pkg_resources.iter_entry_points(group))
+
+
+def _load_plugins(target, timer):
+    """ Imports module *target* or, if there is no such module,
+        loads all entry points of group *target*
+    """
+    try:
+        timer.load(target, importlib.import_module, target)
+        return
+    except ImportError as exc:
+        # Module exists, but could not be imported, so raise error
+        missing = getattr(exc, 'name', None)
+        if missing is not None and missing != target and \
+                not target.startswith(missing + '.'):
+            raise
+
+    entry_points = _iter_entry_points(target)
+    if not entry_points:
+        raise ValueError(
+            "There is no module or entry point group '%s'" % target)
+    for entry_point in entry_points:
+        timer.load(entry_point.module_name
+                   if hasattr(entry_point, 'module_name')
+                   else entry_point.value.split(':')[0],
+                   entry_point.load)
+
+
+def _describe_tree(mcs):
+    """ Returns list of lines describing extension tree *mcs*
+    """
+    root = mcs._get_root()
+    if issubclass(mcs, ExtensibleByHashType):
+        kind = 'ExtensibleByHashType'
+    elif issubclass(mcs, TMeta):
+        kind = 'Extensible'
+    else:
+        kind = 'ExtensibleType'
+    extensions = mcs._get_extensions()
+    lines = [
+        "%s (%s)" % (mcs._cls_name, kind),
+        "    root: %s" % (
+            '%s.%s' % (root.__module__, _qualname(root)) if root else '-'),
+        "    extensions: %d (disabled: %d)" % (
+            len(extensions), len(mcs._disabled)),
+    ]
+
+    if kind == 'ExtensibleByHashType':
+        generated = dict((k, v) for k, v in mcs._generated_class.items()
+                         if v is not None)
+        keys = [None] + sorted(mcs.get_registered_names(), key=repr)
+        lines.append("    keys: %d" % (len(keys) - 1))
+    else:
+        generated = {}
+        if mcs._generated_class is not None:
+            generated[None] = mcs._generated_class
+        keys = [None]
+
+    lines.append(
+        "    cache: %d generated, %d of %s recent, %d for profiles" % (
+            len(generated), len(mcs._class_cache),
+            mcs._class_cache_size, len(mcs._profile_classes)))
+    for key in keys:
+        cls = generated.get(key, None)
+        lines.append("    %-24s extensions: %-5d MRO length: %s" % (
+            '(default)' if key is None else repr(key),
+            len(mcs._get_active_bases(key)),
+            len(cls.__mro__) if cls is not None else '- (not generated)'))
+    return lines
+
+
+def _inspect(targets, stream=None):
+    r""" Implementation of *inspect* command:
+        loads plugins, and prints information about all extension trees
+        and import time of modules, that define extensions.
+        Plugins use *extend_me* module (not ``__main__``), so
+        trees are inspected by it::
+
+            >>> import os, shutil, tempfile
+            >>> import extend_me
+            >>> path = tempfile.mkdtemp()
+            >>> with open(os.path.join(path, 'inspect_plugin.py'), 'w') as f:
+            ...     _ = f.write(
+            ...         "import six\n"
+            ...         "from extend_me import ExtensibleByHashType\n"
+            ...         "mc = ExtensibleByHashType._('InspectObject',\n"
+            ...         "                            hashattr='name')\n"
+            ...         "@six.add_metaclass(mc)\n"
+            ...         "class InspectBase(object):\n"
+            ...         "    pass\n"
+            ...         "class InspectA(InspectBase):\n"
+            ...         "    class Meta:\n"
+            ...         "        name = 'a'\n"
+            ...         "mc.get_class('a')\n")
+            >>> sys.path.insert(0, path)
+            >>> stream = six.StringIO()
+            >>> extend_me._inspect(['inspect_plugin'], stream)
+            >>> lines = stream.getvalue().splitlines()
+            >>> start = lines.index('InspectObject (ExtensibleByHashType)')
+            >>> print('\n'.join(lines[start:start + 7]))
+            ... # doctest: +NORMALIZE_WHITESPACE
+            InspectObject (ExtensibleByHashType)
+                root: inspect_plugin.InspectBase
+                extensions: 2 (disabled: 0)
+                keys: 1
+                cache: 1 generated, 1 of 128 recent, 0 for profiles
+                (default)  extensions: 1  MRO length: - (not generated)
+                'a'        extensions: 2  MRO length: 4
+            >>> [l.split()[0] for l in lines[lines.index(
+            ...     'Import time of extension modules '
+            ...     '(self / cumulative, ms):') + 1:]]
+            ['inspect_plugin']
+            >>> extend_me._inspect(['no_such_plugin'], stream)
+            ... # doctest: +ELLIPSIS
+            Traceback (most recent call last):
+            ...
+            ValueError: There is no module or entry point group ...
+            >>> sys.path.remove(path)
+            >>> del sys.modules['inspect_plugin']
+            >>> shutil.rmtree(path)
+    """
+    stream = sys.stdout if stream is None else stream
+    with _ImportTimer() as timer:
+        for target in targets:
+            _load_plugins(target, timer)
+
+    trees = sorted((t for t in _trees if t._get_extensions()),
+                   key=lambda t: t._cls_name)
+    stream.write("Extension trees: %d\n\n" % len(trees))
+    modules = set()
+    for tree in trees:
+        for line in _describe_tree(tree):
+            stream.write(line + '\n')
+        stream.write('\n')
+        modules.update(c.__module__ for c in tree._get_extensions())
+
+    stream.write("Import time of extension modules (self / cumulative, ms):\n")
+    for name, (self_time, cumulative) in sorted(
+            timer.times.items(), key=lambda i: -i[1][1]):
+        if name in modules:
+            stream.write("    %-50s %10.2f %10.2f\n" % (
+                name, self_time * 1000, cumulative * 1000))
+
+
+def _main(argv):
+    """ Entry point of ``python -m extend_me``
+
+        Without arguments runs doctests. With arguments
+        ``inspect <module-or-entry-point-group> [...]`` prints
+        information about extension trees, created by specified plugins
+    """
+    if argv and argv[0] == 'inspect':
+        if len(argv) < 2:
+            sys.stderr.write(
+                "Usage: python -m extend_me inspect "
+                "<module-or-entry-point-group> [...]\n")
+            return 2
+        # When module is started as script, plugins still use
+        # *extend_me* module, so all trees are registered there
+        extend_me = importlib.import_module('extend_me')
+        try:
+            extend_me._inspect(argv[1:])
+        except ValueError as exc:
+            sys.stderr.write("%s\n" % exc)
+            return 1
+        return 0
+
     import doctest
-    exit(doctest.testmod().failed)
+    return doctest.testmod().failed
+
+
+if __name__ == '__main__':
+    exit(_main(sys.argv[1:]))
@@ -0,0 +1,51 @@
+""" Pytest plugin for projects, that use *extend_me*.
+
+Provides fixture *extend_me_registry*, that saves state of all extension
+trees before test and restores it after test, so extensions defined
+by test do not leak to other tests::
+
+    def test_my_extension(extend_me_registry):
+        class MyServiceExt(MyService):
+            pass
+
+        ...
+
+To isolate all tests of some module (or whole test suite, if used
+in *conftest.py*), use autouse fixture::
+
+    @pytest.fixture(autouse=True)
+    def isolated_registry(extend_me_registry):
+        yield
+
+The fixture yields snapshot object, so state saved before test could be
+restored in the middle of test as well: ``extend_me_registry.restore()``
+"""
+import pytest
+
+import extend_me
+
+
+@pytest.fixture
+def extend_me_registry():
+    """ Saves state of all extension trees, and restores it after test.
+        Extensions registered between setup and teardown of fixture
+        (in generator, same way as pytest runs it) are dropped::
+
+            >>> import six
+            >>> mc = extend_me.ExtensibleType._("FixtureObject")
+            >>> @six.add_metaclass(mc)
+            ... class FixtureObject(object):
+            ...     pass
+            >>> fixture = getattr(extend_me_registry, '__wrapped__',
+            ...                   extend_me_registry)()
+            >>> snapshot = next(fixture)
+            >>> class FixtureObjectExt(FixtureObject):
+            ...     pass
+            >>> FixtureObjectExt in mc.get_class().__bases__
+            True
+            >>> next(fixture, None)
+            >>> mc.get_class().__bases__ == (FixtureObject,)
+            True
+    """
+    with extend_me.snapshot() as snapshot:
+        yield snapshot
@@ -18,7 +18,10 @@ setup(
         'six>=1.13',
     ],
     license="MPL 2.0",
-    py_modules=['extend_me'],
+    py_modules=['extend_me', 'extend_me_pytest'],
+    entry_points={
+        'pytest11': ['extend_me = extend_me_pytest'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',